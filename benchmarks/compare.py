@@ -0,0 +1,37 @@
+"""
+Compare two benchmarks/run.py result files stage by stage.
+
+    python benchmarks/compare.py old.json new.json
+"""
+import argparse
+import json
+
+
+def load(path):
+    with open(path) as f:
+        data = json.load(f)
+    return data["meta"], {(r["family"], r["rows"], r["stage"]): r for r in data["results"]}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Diff two benchmark result files.")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="flag stages whose time grew by more than this factor")
+    args = parser.parse_args(argv)
+
+    old_meta, old = load(args.old)
+    new_meta, new = load(args.new)
+    print(f"old: {old_meta.get('commit')}  new: {new_meta.get('commit')}")
+    print(f"{'family':>6} {'rows':>9} {'stage':<22} {'old s':>9} {'new s':>9} {'ratio':>6} {'old MB':>8} {'new MB':>8}")
+    for key in sorted(set(old) & set(new)):
+        o, n = old[key], new[key]
+        ratio = n["seconds"] / o["seconds"] if o["seconds"] else float("inf")
+        flag = "  <-- slower" if ratio > args.threshold else ""
+        print(f"{key[0]:>6} {key[1]:>9,} {key[2]:<22} {o['seconds']:9.3f} {n['seconds']:9.3f} "
+              f"{ratio:6.2f} {o['peak_mb']:8.1f} {n['peak_mb']:8.1f}{flag}")
+
+
+if __name__ == "__main__":
+    main()
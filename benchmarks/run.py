@@ -0,0 +1,231 @@
+"""
+Time and memory benchmarks for the dashboard pipelines.
+
+Run from the repository root::
+
+    python benchmarks/run.py --sizes 10000 100000 1000000 --family base 2024
+
+Each stage is timed (best of ``--repeat`` runs) and then run once more under
+tracemalloc for its peak allocation. Results go to a JSON file that
+benchmarks/compare.py can diff against a run from another commit.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, os.path.join(ROOT, "streamlit"))
+
+from synthetic import LABEL_COLUMN, make_dataset  # noqa: E402
+
+
+class FakeUpload(io.BytesIO):
+    """Just enough of Streamlit's UploadedFile for ingest.read_upload"""
+
+    def __init__(self, data, name):
+        super().__init__(data)
+        self.name = name
+        self.size = len(data)
+
+    def getbuffer(self):
+        return self.getvalue()
+
+
+def measure(fn, repeat=1):
+    """
+    Best wall time of ``fn`` over ``repeat`` runs, plus its peak traced memory
+
+    :return: (seconds, peak MB, last return value)
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak / 1e6, result
+
+
+# The pre-encoder predict pipeline, kept as the reference point
+def legacy_process_input(df, drop_column=None):
+    if drop_column and drop_column in df.columns:
+        df = df.drop(columns=[drop_column])
+    numeric_df = df.select_dtypes(exclude=['object', 'category', 'string'])
+    object_df = df.select_dtypes(include=['object', 'category', 'string'])
+    if not object_df.empty:
+        return pd.concat([numeric_df, pd.get_dummies(object_df.astype(str))], axis=1)
+    return numeric_df
+
+
+def legacy_align(input_df, model_features):
+    input_df = input_df.copy()
+    for col in [c for c in model_features if c not in input_df.columns]:
+        input_df[col] = 0
+    return input_df[model_features]
+
+
+def legacy_trends(df, service_col, time_cols):
+    for time_col in time_cols:
+        trend_df = df[[service_col, time_col]].dropna()
+        trend_df[time_col] = trend_df[time_col].astype(str)
+        trend_df.groupby([time_col, service_col], observed=True).size()
+        trend_df.groupby(time_col, observed=True).size()
+
+
+def train_reference_model(family, seed=0):
+    from sklearn.ensemble import RandomForestClassifier
+
+    train = make_dataset(family, 20_000, seed=seed + 1)
+    X = legacy_process_input(train, drop_column=LABEL_COLUMN)
+    return RandomForestClassifier(n_estimators=50, n_jobs=1, random_state=seed).fit(X, train[LABEL_COLUMN])
+
+
+def run_family(family, n_rows, args, model):
+    import ingest
+    import map_layers
+    from features import FeatureEncoder, model_feature_names
+    from geo_aggregate import AggregationPyramid
+    from model_families import required_columns
+    from trend_cube import TrendCube
+
+    results = []
+
+    def record(stage, fn, rows=n_rows, **extra):
+        seconds, peak_mb, value = measure(fn, args.repeat)
+        # ``rows`` is the dataset size; ``stage_rows`` what this stage actually processed
+        results.append({"family": family, "rows": n_rows, "stage_rows": rows, "stage": stage,
+                        "seconds": seconds, "rows_per_second": rows / seconds if seconds else None,
+                        "peak_mb": peak_mb, **extra})
+        print(f"  {family:>4} {n_rows:>9,} {stage:<22} {seconds:8.3f}s {peak_mb:9.1f} MB", flush=True)
+        return value
+
+    raw = make_dataset(family, n_rows, seed=args.seed)
+    csv_bytes = raw.to_csv(index=False).encode()
+
+    def ingest_cold():
+        ingest._frames.clear()
+        ingest._file_ids.clear()
+        path = ingest.cached_table_path(ingest.content_fingerprint(csv_bytes))
+        if path:
+            os.remove(path)
+        return ingest.read_upload(FakeUpload(csv_bytes, "upload.csv"))[0]
+
+    def ingest_warm():
+        ingest._frames.clear()
+        return ingest.read_upload(FakeUpload(csv_bytes, "upload.csv"))[0]
+
+    record("ingest_parse", ingest_cold, csv_mb=len(csv_bytes) / 1e6)
+    df = record("ingest_cached", ingest_warm)
+
+    features = model_feature_names(model)
+    processed = record("process_input_legacy", lambda: legacy_process_input(df, LABEL_COLUMN))
+    record("feature_align_legacy", lambda: legacy_align(processed, features))
+    encoder = FeatureEncoder(features, required_columns(family))
+    X = record("encode", lambda: encoder.transform_frame(df, drop_column=LABEL_COLUMN))
+    record("predict", lambda: model.predict(X))
+
+    lat, lon = "address_latitude", "address_longitude"
+    marker_rows = min(n_rows, args.marker_limit)
+    record("create_map", lambda: map_layers.marker_map(df.head(marker_rows), lat, lon, ["Gender"])
+           .get_root().render(), rows=marker_rows)
+    html = record("cluster_map", lambda: map_layers.cluster_map(df, lat, lon, ["Gender"]).get_root().render())
+    results[-1]["html_mb"] = len(html) / 1e6
+    html = record("create_heatmap", lambda: map_layers.heatmap(df, lat, lon).get_root().render())
+    results[-1]["html_mb"] = len(html) / 1e6
+    pyramid = record("pyramid_build", lambda: AggregationPyramid(df[lat], df[lon]))
+    html = record("aggregated_heatmap", lambda: map_layers.aggregated_heatmap(
+        pyramid, pyramid.fit_zoom()).get_root().render())
+    results[-1]["html_mb"] = len(html) / 1e6
+
+    time_cols = ["Year", "Month", "Day"]
+    record("trend_groupby_legacy", lambda: legacy_trends(df, "Gender", time_cols))
+
+    def cube_slices():
+        cube = TrendCube(df)
+        for time_col in time_cols:
+            cube.separate(time_col, "Gender")
+            cube.total(time_col, "Gender")
+        return cube
+
+    cube = record("trend_cube_build", cube_slices)
+    record("trend_cube_slice", lambda: [cube.separate(t, "Gender") for t in time_cols])
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard pipelines on synthetic data.")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--family", nargs="+", choices=["base", "2024"], default=["base"])
+    parser.add_argument("--model", help="pickled model to benchmark (default: train a small RandomForest)")
+    parser.add_argument("--repeat", type=int, default=1, help="timed runs per stage (best is kept)")
+    parser.add_argument("--marker-limit", type=int, default=5_000,
+                        help="row cap for the per-row folium.Marker map")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", help="JSON output path (default: benchmarks/results/<commit>.json)")
+    args = parser.parse_args(argv)
+
+    # Keep benchmark cache files away from the real ingestion cache
+    cache_dir = tempfile.mkdtemp(prefix="fyp-bench-")
+    os.environ["FYP_CACHE_DIR"] = cache_dir
+
+    try:
+        commit = git_commit()
+        results = []
+        for family in args.family:
+            if args.model:
+                import joblib
+                model, model_name = joblib.load(args.model), os.path.basename(args.model)
+            else:
+                model, model_name = train_reference_model(family, args.seed), "synthetic RandomForest(50)"
+            for n_rows in args.sizes:
+                for row in run_family(family, n_rows, args, model):
+                    row["model"] = model_name
+                    results.append(row)
+
+        output = args.output or os.path.join(HERE, "results", f"{commit or 'run'}-{int(time.time())}.json")
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        meta = {
+            "commit": commit,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "seed": args.seed,
+        }
+        with open(output, "w") as f:
+            json.dump({"meta": meta, "results": results}, f, indent=2)
+        print(f"Results written to {output}")
+    finally:
+        # Arrow tables from every size can add up to several GB
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
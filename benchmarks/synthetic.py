@@ -0,0 +1,70 @@
+"""
+Seeded synthetic datasets shaped like the predict pages' uploads.
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "streamlit"))
+
+from model_families import numeric_columns, required_columns  # noqa: E402
+
+# Rough bounding box of Hong Kong's populated areas
+HK_LAT = (22.19, 22.56)
+HK_LON = (113.90, 114.30)
+
+LABEL_COLUMN = "Service_Type"
+
+CATEGORIES = {
+    'Gender': ['M', 'F'],
+    'One_Way_Permit_Application_Category': ['Spouse', 'Child', 'Elderly Parent', 'Other'],
+    'Social_Welfare_Department': ['Yes', 'No'],
+    'Receive_Communications': ['Yes', 'No'],
+    'Knows_Cantonese': ['Yes', 'No'],
+    'Education': ['Primary', 'Secondary', 'Post-secondary', 'Degree', 'None'],
+    'Had_Long_Term_Work_in_Mainland_Before_Arrival': ['Yes', 'No'],
+    'Occupation': ['Service', 'Manufacturing', 'Clerical', 'Professional', 'Homemaker',
+                   'Student', 'Retired', 'Unemployed'],
+    'Settlement_Father': ['Hong Kong', 'Mainland', 'Deceased', 'Unknown'],
+    'Settlement_Mother': ['Hong Kong', 'Mainland', 'Deceased', 'Unknown'],
+}
+SERVICES = ['Employment', 'Housing', 'Education', 'Family', 'Health', 'Financial']
+
+
+def _numeric(col, n, rng):
+    if col.endswith('latitude'):
+        return rng.uniform(*HK_LAT, n)
+    if col.endswith('longitude'):
+        return rng.uniform(*HK_LON, n)
+    if col == 'age':
+        return rng.integers(0, 90, n)
+    if col == 'Year':
+        return rng.integers(2015, 2025, n)
+    if col == 'Month':
+        return rng.integers(1, 13, n)
+    if col == 'Day':
+        return rng.integers(1, 29, n)
+    return rng.integers(0, 5, n)
+
+
+def make_dataset(family="base", n_rows=10_000, seed=0):
+    """
+    Function to generate an upload matching a model family's REQUIRED_COLUMNS
+
+    :param family: str, 'base' or '2024'
+    :param n_rows: int, number of rows
+    :param seed: int, RNG seed; the same seed always gives the same frame
+    :return: pandas.DataFrame with the family's columns plus a service label
+    """
+    rng = np.random.default_rng(seed)
+    numeric = set(numeric_columns(family))
+    data = {}
+    for col in required_columns(family):
+        if col in numeric:
+            data[col] = _numeric(col, n_rows, rng)
+        else:
+            data[col] = rng.choice(CATEGORIES.get(col, ['A', 'B', 'C']), n_rows)
+    data[LABEL_COLUMN] = rng.choice(SERVICES, n_rows)
+    return pd.DataFrame(data)
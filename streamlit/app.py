@@ -1,11 +1,21 @@
 import streamlit as st
 import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
 import plotly.express as px
+from ingest import memory_report, read_upload
+from trend_cube import TrendCube
+from profiler import describe, start_profile
+from charts import distribution_figure
+from instrument import begin_run, mark_cache, render_panel, stage
+from dataset import DatasetHandle, dataset_cache
+from model_families import available_models, model_path
+from model_registry import preload_models
 
 st.set_page_config(page_title="FYP - Interactive Dashboard", layout="wide")
 st.title("📊 FYP - Interactive Data Analysis")
+# Stage timings for this rerun, shown in the optional sidebar panel
+begin_run("app")
+# Load and warm the predict pages' models in the background at startup
+preload_models([model_path(family, name) for family, name in available_models()])
 
 # PART 1: File upload
 st.sidebar.title("Upload your data")
@@ -14,23 +24,43 @@ uploaded_file = st.sidebar.file_uploader("Choose a CSV or Excel file", type=['cs
 # Initialize df
 df = None
 
-@st.cache_data
+# Shared ingestion cache: each upload is parsed once, then read back from disk
 def load_data(uploaded_file):
     try:
-        if uploaded_file.name.endswith('.xlsx'):
-            return pd.read_excel(uploaded_file)
-        elif uploaded_file.name.endswith('.csv'):
-            return pd.read_csv(uploaded_file)
-        return None
+        with stage("ingest"):
+            df, fingerprint = read_upload(uploaded_file)
+        report = memory_report(fingerprint)
+        if report:
+            st.sidebar.caption(f"🧮 Memory: {report['before_mb']:.1f} MB → {report['after_mb']:.1f} MB "
+                               f"({len(report['columns'])} columns compacted)")
+        return df, fingerprint
     except Exception as e:
         st.sidebar.error(f"❌ Error loading file: {e}")
-        return None
+        return None, None
+
+# One aggregation cube per dataset, keyed by the upload's fingerprint
+@dataset_cache(max_entries=4)
+def get_trend_cube(data):
+    return TrendCube(data.df)
+
+def get_profile(df):
+    profile_future = start_profile(st.session_state.get('df_fingerprint'), df)
+    with stage("profile_wait"):
+        mark_cache(profile_future.done())
+        if not profile_future.done():
+            with st.spinner("Profiling dataset..."):
+                profile_future.result()
+    return profile_future.result()
 
 if uploaded_file is not None:
-    df = load_data(uploaded_file)
+    df, fingerprint = load_data(uploaded_file)
     st.sidebar.success("✅ File uploaded successfully!")
     # Store the DataFrame in session_state
     st.session_state['df'] = df
+    st.session_state['df_fingerprint'] = fingerprint
+    # Profile every column in the background while the user looks around
+    if df is not None:
+        start_profile(fingerprint, df)
 
 # PART 2: Show raw data
 if df is not None:
@@ -43,27 +73,26 @@ if df is not None:
     st.subheader("Filter & Visualize Data")
     target_col = st.selectbox("Select target column for visualizations", options=[''] + list(df.columns))
     if target_col:
-        plt.figure(figsize=(10, 5))
-        if df[target_col].nunique() > 2:
-            st.subheader(f"Histogram of {target_col}")
-            sns.histplot(df[target_col])
-        else:
-            st.subheader(f"Count plot of {target_col}")
-            sns.countplot(x=target_col, data=df)
-        st.pyplot(plt.gcf())
-        plt.clf()
+        # Bars come from the cached profile, not from the full column
+        stats = get_profile(df)[target_col]
+        with stage("distribution_chart"):
+            title, fig = distribution_figure(target_col, stats)
+        st.subheader(title)
+        st.plotly_chart(fig, use_container_width=True)
 
     # PART 4: Summary Statistics (Detailed)
     st.subheader("📌 Detailed Summary Statistics")
     attribute_stats = st.selectbox("Select attribute for summary stats", options=[''] + list(df.columns))
     if attribute_stats:
+        stats = get_profile(df)[attribute_stats]
+
         st.write("**Describe:**")
-        st.write(df[attribute_stats].describe(include='all'))
+        st.write(describe(stats))
         
         st.write("**Additional Info:**")
-        non_null = df[attribute_stats].notnull().sum()
-        unique = df[attribute_stats].nunique()
-        dtype = df[attribute_stats].dtype
+        non_null = stats['non_null']
+        unique = f"~{stats['unique']:,} (estimated)" if stats['unique_is_estimate'] else stats['unique']
+        dtype = stats['dtype']
         st.markdown(f"""
         - **Non-null count:** {non_null}
         - **Unique values:** {unique}
@@ -77,33 +106,46 @@ if df is not None:
     trend_mode = st.selectbox("How to display trend?", ["Sum All Classes", "Separate Classes"])
 
     if trend_service_col and time_col:
-        trend_df = df[[trend_service_col, time_col]].dropna()
-        if df[time_col].dtype in ['int64', 'int32']:
-            trend_df[time_col] = trend_df[time_col].astype(str)
+        # Charts are sliced from the cube; only the first request per column aggregates
+        with stage("trend_cube", cached=True):
+            cube = get_trend_cube(DatasetHandle(df, st.session_state.get('df_fingerprint')))
+        with stage("trend_slice"):
+            categorical = cube.is_categorical(trend_service_col)
+
+            if trend_mode == "Separate Classes":
+                trend_grouped = cube.separate(time_col, trend_service_col)
+                if categorical:
+                    st.subheader(f"{trend_service_col} Count by {time_col} (Separate Classes)")
+                else:
+                    st.subheader(f"Value Distribution by {time_col} (Separate Classes)")
+            elif categorical:
+                trend_grouped = cube.total(time_col, trend_service_col)
+                st.subheader(f"Total Count of {trend_service_col} by {time_col}")
+            else:
+                trend_grouped = cube.mean(time_col, trend_service_col)
+                st.subheader(f"Average {trend_service_col} by {time_col} (Summed)")
+
+        if pd.api.types.is_integer_dtype(df[time_col]):
+            trend_grouped[time_col] = trend_grouped[time_col].astype(str)
 
         if trend_mode == "Separate Classes":
-            if df[trend_service_col].dtype == 'object' or df[trend_service_col].nunique() < 10:
-                trend_grouped = trend_df.groupby([time_col, trend_service_col]).size().reset_index(name='Count')
-                st.subheader(f"{trend_service_col} Count by {time_col} (Separate Classes)")
+            if categorical:
                 fig = px.bar(trend_grouped, x=time_col, y='Count', color=trend_service_col, barmode='group')
             else:
-                trend_grouped = trend_df.groupby([time_col, trend_service_col]).size().reset_index(name='Count')
-                fig = px.line(trend_grouped, x=time_col, y='Count', color=trend_service_col, markers=True)
-                st.subheader(f"Value Distribution by {time_col} (Separate Classes)")
+                fig = px.line(trend_grouped, x=time_col, y='Count', color=trend_service_col, markers=True,
+                              render_mode='webgl')
+        elif categorical:
+            fig = px.bar(trend_grouped, x=time_col, y='Total Count')
         else:
-            if df[trend_service_col].dtype == 'object' or df[trend_service_col].nunique() < 10:
-                trend_grouped = trend_df.groupby(time_col).size().reset_index(name='Total Count')
-                fig = px.bar(trend_grouped, x=time_col, y='Total Count')
-                st.subheader(f"Total Count of {trend_service_col} by {time_col}")
-            else:
-                trend_grouped = trend_df.groupby(time_col)[trend_service_col].mean().reset_index()
-                fig = px.line(trend_grouped, x=time_col, y=trend_service_col, markers=True)
-                st.subheader(f"Average {trend_service_col} by {time_col} (Summed)")
+            fig = px.line(trend_grouped, x=time_col, y=trend_service_col, markers=True, render_mode='webgl')
 
-        st.plotly_chart(fig, use_container_width=True)
+        with stage("trend_render"):
+            st.plotly_chart(fig, use_container_width=True)
 else:
     st.write("📂 Please upload a dataset in the sidebar to begin.")
 
 # Sidebar instructions
 st.sidebar.markdown("---")
-st.sidebar.info("Upload a `.xlsx` or `.csv` file, then explore filtering, visualizations, and trends.")
\ No newline at end of file
+st.sidebar.info("Upload a `.xlsx` or `.csv` file, then explore filtering, visualizations, and trends.")
+
+render_panel()
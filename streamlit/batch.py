@@ -0,0 +1,185 @@
+import glob
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+PREDICTION_COLUMN = "Predicted_Service_Type"
+OUTPUT_PREFIX = "predictions_"
+
+
+def iter_chunks(source, name, chunksize=50_000):
+    """
+    Yield an upload as DataFrame chunks without parsing it all at once
+
+    :param source: path or file-like object (e.g. a Streamlit UploadedFile),
+                   or the path of a cached ``.arrow`` table
+    :param name: str, file name, used to pick the reader
+    :param chunksize: int, rows per chunk
+    """
+    if name.lower().endswith(".arrow"):
+        yield from _iter_arrow_chunks(source, chunksize)
+        return
+    if hasattr(source, "seek"):
+        source.seek(0)
+    if name.lower().endswith(".csv"):
+        yield from pd.read_csv(source, chunksize=chunksize)
+    else:
+        yield from _iter_excel_chunks(source, chunksize)
+
+
+def _iter_arrow_chunks(path, chunksize):
+    # Cached uploads (see ingest.py) are memory-mapped, so slicing is cheap
+    import pyarrow as pa
+
+    with pa.memory_map(path, "r") as source:
+        table = pa.ipc.open_file(source).read_all()
+        for start in range(0, table.num_rows, chunksize):
+            chunk = table.slice(start, chunksize).to_pandas()
+            chunk.index = pd.RangeIndex(start, start + len(chunk))
+            yield chunk
+
+
+def _iter_excel_chunks(source, chunksize):
+    from openpyxl import load_workbook
+
+    wb = load_workbook(source, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        buf = []
+        for row in rows:
+            buf.append(row)
+            if len(buf) == chunksize:
+                yield pd.DataFrame(buf, columns=header)
+                buf = []
+        if buf:
+            yield pd.DataFrame(buf, columns=header)
+    finally:
+        wb.close()
+
+
+def iter_frame_chunks(df, chunksize=50_000):
+    """Yield row slices of an already loaded DataFrame"""
+    for start in range(0, len(df), chunksize):
+        yield df.iloc[start:start + chunksize]
+
+
+def score_chunks(chunks, model, encoder, drop_column=None):
+    """
+    Encode and score each chunk, yielding the raw rows plus predictions
+
+    Only one chunk's feature matrix is alive at a time, so peak memory is set
+    by the chunk size rather than by the size of the upload.
+    """
+    for chunk in chunks:
+        features = encoder.transform_frame(chunk, drop_column=drop_column)
+        out = chunk.copy()
+        out[PREDICTION_COLUMN] = model.predict(features)
+        yield out
+
+
+class PredictionWriter:
+    """
+    Appends scored chunks to a CSV or Parquet file on disk
+
+    Use as a context manager; ``path`` stays on disk after closing so the page
+    can offer it for download.
+    """
+
+    def __init__(self, fmt="csv", path=None):
+        self.fmt = fmt
+        if path is None:
+            fd, path = tempfile.mkstemp(prefix=OUTPUT_PREFIX, suffix=f".{fmt}")
+            os.close(fd)
+        self.path = path
+        self.rows = 0
+        self._parquet = None
+        self._schema = None
+
+    def write(self, chunk):
+        if self.fmt == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            if self._parquet is None:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                self._schema = table.schema
+                self._parquet = pq.ParquetWriter(self.path, self._schema)
+            else:
+                table = pa.Table.from_pandas(chunk, schema=self._schema, preserve_index=False)
+            self._parquet.write_table(table)
+        else:
+            chunk.to_csv(self.path, mode="w" if self.rows == 0 else "a",
+                         header=self.rows == 0, index=False)
+        self.rows += len(chunk)
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+            self._parquet = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_page(path, fmt, page, page_size=100):
+    """
+    Read one page of a written prediction file without loading all of it
+
+    :param page: int, zero-based page number
+    """
+    start = page * page_size
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        pf = pq.ParquetFile(path)
+        frames, offset = [], 0
+        for i in range(pf.num_row_groups):
+            n = pf.metadata.row_group(i).num_rows
+            if offset + n > start and offset < start + page_size:
+                frames.append(pf.read_row_group(i).to_pandas())
+            elif frames:
+                break
+            if not frames:
+                offset += n
+        if not frames:
+            return pd.DataFrame()
+        df = pd.concat(frames, ignore_index=True)
+        return df.iloc[start - offset:start - offset + page_size].reset_index(drop=True)
+    return pd.read_csv(path, skiprows=range(1, start + 1), nrows=page_size)
+
+
+def file_download(path):
+    """
+    ``data`` callable for ``st.download_button`` that reads ``path`` on click
+
+    Passing an open file makes Streamlit read the whole file into its media
+    store on every rerun; a callable defers that until the button is pressed.
+    """
+    def read():
+        with open(path, "rb") as f:
+            return f.read()
+    return read
+
+
+def remove_stale_outputs(max_age_seconds=6 * 3600):
+    """
+    Delete prediction files left in the temp directory by earlier sessions
+
+    :param max_age_seconds: float, files not modified for this long are removed
+    """
+    cutoff = time.time() - max_age_seconds
+    for path in glob.glob(os.path.join(tempfile.gettempdir(), OUTPUT_PREFIX + "*")):
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            # Another session may be removing the same file
+            pass
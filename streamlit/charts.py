@@ -0,0 +1,30 @@
+import numpy as np
+import plotly.graph_objects as go
+
+
+def distribution_figure(col, stats):
+    """
+    Bar chart of a column's distribution drawn from its precomputed profile
+
+    The bars come from the profiler's value counts or histogram bins, so the
+    figure holds at most a few dozen bars whatever the row count.
+
+    :param col: str, column name
+    :param stats: dict, the column's entry from profiler.profile_frame
+    :return: (title str, plotly Figure)
+    """
+    hist = stats.get("histogram")
+    if stats["unique"] > 2 and hist is not None:
+        edges = hist["edges"]
+        fig = go.Figure(go.Bar(x=(edges[:-1] + edges[1:]) / 2, y=hist["counts"],
+                               width=np.diff(edges), marker_line_width=0))
+        fig.update_layout(bargap=0)
+        title = f"Histogram of {col}"
+    else:
+        counts = stats["value_counts"]
+        if stats["unique"] <= 2:
+            counts = counts.sort_index()
+        fig = go.Figure(go.Bar(x=[str(v) for v in counts.index], y=counts.to_numpy()))
+        title = f"Count plot of {col}" if stats["unique"] <= 2 else f"Histogram of {col}"
+    fig.update_layout(xaxis_title=col, yaxis_title="Count")
+    return title, fig
@@ -0,0 +1,93 @@
+import functools
+import threading
+from collections import OrderedDict
+
+from disk_cache import content_fingerprint
+from instrument import mark_cache
+
+
+class DatasetHandle:
+    """
+    A DataFrame plus a content fingerprint computed once
+
+    Cached stages are keyed by the fingerprint instead of the frame, so a
+    lookup costs the same for ten rows or ten million. Frames derived from a
+    handle (filtered, joined, sliced) get a fingerprint from the parent's and
+    a description of the step, without hashing any data.
+    """
+
+    __slots__ = ("df", "fingerprint")
+
+    def __init__(self, df, fingerprint):
+        """
+        :param df: pandas.DataFrame (or GeoDataFrame); treat as read-only
+        :param fingerprint: str, content hash of the data the frame came from
+        """
+        self.df = df
+        self.fingerprint = fingerprint
+
+    def derive(self, df, *step):
+        """
+        Handle for a frame computed from this one
+
+        :param df: the derived frame
+        :param step: hashable values that fully describe how it was derived,
+                     e.g. ('coords', lat_col, lon_col)
+        """
+        return DatasetHandle(df, content_fingerprint(repr((self.fingerprint,) + step).encode()))
+
+    def __len__(self):
+        return len(self.df)
+
+
+# Results per cached function. Page scripts re-run their ``def``s on every
+# rerun, so stores live here, keyed by where the function is defined and its
+# bytecode (an edited function starts with an empty store)
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def _freeze(value):
+    # Lists (e.g. popup columns from a multiselect) become hashable tuples
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    return value
+
+
+def dataset_cache(max_entries=16):
+    """
+    Per-process LRU for functions whose first argument is a DatasetHandle
+
+    Keys are the handle's fingerprint plus the remaining arguments, so
+    nothing is hashed or pickled on a hit; results are shared, not copied,
+    like ``st.cache_resource``. The wrapped function gets ``clear()``.
+
+    :param max_entries: int, results kept per function
+    """
+    def decorator(fn):
+        code = fn.__code__
+        with _stores_lock:
+            entries, lock = _stores.setdefault((code.co_filename, fn.__qualname__, code.co_code),
+                                               (OrderedDict(), threading.Lock()))
+
+        @functools.wraps(fn)
+        def wrapper(data, *args, **kwargs):
+            key = (data.fingerprint, _freeze(args), _freeze(kwargs))
+            with lock:
+                if key in entries:
+                    entries.move_to_end(key)
+                    mark_cache(True)
+                    return entries[key]
+            mark_cache(False)
+            value = fn(data, *args, **kwargs)
+            with lock:
+                entries[key] = value
+                while len(entries) > max_entries:
+                    entries.popitem(last=False)
+            return value
+
+        wrapper.clear = entries.clear
+        return wrapper
+    return decorator
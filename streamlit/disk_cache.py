@@ -0,0 +1,92 @@
+import hashlib
+import os
+import tempfile
+import threading
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "fyp-dashboard")
+
+
+def content_fingerprint(data):
+    """
+    Short hex digest identifying an upload by its bytes
+
+    :param data: bytes or memoryview, raw file contents
+    """
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class DiskCache:
+    """
+    Size-bounded, content-addressed file cache with LRU eviction.
+
+    Each entry is one file named ``<key><suffix>`` under the cache directory.
+    Reads bump the file's mtime, and eviction removes the least recently used
+    files until the directory fits in ``max_bytes``.
+    """
+
+    def __init__(self, name, max_bytes=2 * 1024 ** 3, root=None):
+        """
+        :param name: str, sub-directory for this cache (e.g. 'shapes')
+        :param max_bytes: int, total size bound for the directory
+        :param root: str, base directory; defaults to $FYP_CACHE_DIR or ~/.cache
+        """
+        root = root or os.environ.get("FYP_CACHE_DIR", DEFAULT_CACHE_DIR)
+        self.dir = os.path.join(root, name)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(self.dir, exist_ok=True)
+
+    def path(self, key, suffix=""):
+        return os.path.join(self.dir, f"{key}{suffix}")
+
+    def get(self, key, suffix=""):
+        """Path of a cached entry (marked as recently used), or None"""
+        path = self.path(key, suffix)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, key, suffix, write):
+        """
+        Store an entry by calling ``write(tmp_path)``, then publish it atomically
+
+        :return: str, path of the stored entry
+        """
+        path = self.path(key, suffix)
+        fd, tmp = tempfile.mkstemp(dir=self.dir, prefix=".tmp-", suffix=suffix)
+        os.close(fd)
+        try:
+            write(tmp)
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        self.evict(keep=path)
+        return path
+
+    def evict(self, keep=None):
+        """Remove least recently used entries until the cache fits its bound"""
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.dir):
+                if name.startswith(".tmp-"):
+                    continue
+                full = os.path.join(self.dir, name)
+                try:
+                    st = os.stat(full)
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, full))
+            total = sum(size for _, size, _ in entries)
+            for _, size, full in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if full == keep:
+                    continue
+                try:
+                    os.remove(full)
+                except FileNotFoundError:
+                    pass
+                total -= size
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+
+def plan_dtypes(df, max_category_ratio=0.5, max_categories=1000):
+    """
+    Work out a memory-compact dtype for every column
+
+    Integers are downcast to the smallest type that holds their range, floats
+    to float32 only when that round-trips exactly (coordinates keep float64),
+    and low-cardinality string columns become categoricals.
+
+    :param df: pandas.DataFrame
+    :param max_category_ratio: float, max distinct/rows ratio for a categorical
+    :param max_categories: int, max distinct values for a categorical
+    :return: dict mapping column name to target dtype (only changed columns)
+    """
+    plan = {}
+    n_rows = len(df)
+    for col in df.columns:
+        s = df[col]
+        if pd.api.types.is_bool_dtype(s):
+            continue
+        if pd.api.types.is_integer_dtype(s):
+            target = pd.to_numeric(s, downcast="integer").dtype
+            if target != s.dtype:
+                plan[col] = target
+        elif pd.api.types.is_float_dtype(s):
+            if s.dtype != np.float32:
+                values = s.to_numpy()
+                as32 = values.astype(np.float32)
+                if np.array_equal(as32.astype(values.dtype), values, equal_nan=True):
+                    plan[col] = np.dtype(np.float32)
+        elif pd.api.types.is_object_dtype(s) or pd.api.types.is_string_dtype(s):
+            if isinstance(s.dtype, pd.CategoricalDtype):
+                continue
+            n_unique = s.nunique(dropna=True)
+            if n_unique <= max_categories and n_unique <= max_category_ratio * max(n_rows, 1):
+                plan[col] = "category"
+    return plan
+
+
+def compact_frame(df, **kwargs):
+    """
+    Apply ``plan_dtypes`` and report memory before and after
+
+    :return: (compacted DataFrame, {'before_mb', 'after_mb', 'columns'})
+    """
+    before = df.memory_usage(deep=True).sum()
+    plan = plan_dtypes(df, **kwargs)
+    out = df.astype(plan) if plan else df
+    after = out.memory_usage(deep=True).sum()
+    report = {
+        "before_mb": float(before) / 1e6,
+        "after_mb": float(after) / 1e6,
+        "columns": {col: str(dtype) for col, dtype in plan.items()},
+    }
+    return out, report
+
+
+def is_categorical_like(series, max_unique=10):
+    """Text/categorical columns, or numeric ones with only a handful of values"""
+    return (pd.api.types.is_object_dtype(series)
+            or isinstance(series.dtype, pd.CategoricalDtype)
+            or pd.api.types.is_string_dtype(series)
+            or series.nunique() < max_unique)
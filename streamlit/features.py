@@ -0,0 +1,129 @@
+import numpy as np
+import pandas as pd
+
+
+def model_feature_names(model):
+    """
+    Return the feature names a fitted model expects, in training order
+
+    :param model: fitted sklearn estimator or XGBoost sklearn wrapper
+    :return: list of str
+    """
+    if hasattr(model, "feature_names_in_"):
+        return list(model.feature_names_in_)
+    return list(model.get_booster().feature_names)
+
+
+class FeatureEncoder:
+    """
+    Maps raw input columns straight into the model's feature matrix.
+
+    The models were trained on ``pd.get_dummies`` output, so every feature is
+    either a raw numeric column (``age``) or a ``<column>_<value>`` indicator
+    (``Gender_M``). The layout is resolved once from the model's feature names;
+    ``transform`` then fills a preallocated matrix column block by column block
+    instead of building dummies and patching in missing columns one by one.
+    """
+
+    def __init__(self, feature_names, columns):
+        """
+        :param feature_names: list of str, model features in training order
+        :param columns: list of str, raw input columns (REQUIRED_COLUMNS)
+        """
+        self.feature_names = list(feature_names)
+        self.columns = list(columns)
+        self.numeric_slots = {}
+        self.dummy_slots = {}
+
+        # Longest prefix first so e.g. 'Settlement_Father' wins over 'Settlement'
+        by_length = sorted(self.columns, key=len, reverse=True)
+        for idx, name in enumerate(self.feature_names):
+            if name in self.columns:
+                self.numeric_slots[name] = idx
+                continue
+            for col in by_length:
+                if name.startswith(col + "_"):
+                    value = name[len(col) + 1:]
+                    self.dummy_slots.setdefault(col, ([], []))
+                    self.dummy_slots[col][0].append(value)
+                    self.dummy_slots[col][1].append(idx)
+                    break
+            # Features matching no raw column stay zero, as the old
+            # ``input_df[col] = 0`` patching did
+
+        self.dummy_slots = {
+            col: (pd.Index(values), np.asarray(slots, dtype=np.intp))
+            for col, (values, slots) in self.dummy_slots.items()
+        }
+
+    @classmethod
+    def from_model(cls, model, columns):
+        return cls(model_feature_names(model), columns)
+
+    def transform(self, df, drop_column=None, sparse=False, dtype=np.float32):
+        """
+        Encode a raw DataFrame into the model's feature matrix
+
+        :param df: pandas.DataFrame, raw upload or manual input
+        :param drop_column: str, column to ignore (e.g. the service label)
+        :param sparse: bool, return a scipy CSR matrix instead of a dense array
+        :param dtype: numpy dtype of the output matrix
+        :return: numpy.ndarray or scipy.sparse.csr_matrix, shape (rows, features)
+        """
+        n_rows = len(df)
+        n_features = len(self.feature_names)
+        present = [c for c in df.columns if c != drop_column]
+
+        if sparse:
+            from scipy import sparse as sp
+
+            rows, cols, vals = [], [], []
+            for col, idx in self.numeric_slots.items():
+                if col in present:
+                    values = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=dtype)
+                    nz = np.flatnonzero(values)
+                    rows.append(nz)
+                    cols.append(np.full(len(nz), idx, dtype=np.intp))
+                    vals.append(values[nz])
+            for col, (categories, slots) in self.dummy_slots.items():
+                if col in present:
+                    codes = self._codes(df[col], categories)
+                    hit = np.flatnonzero(codes >= 0)
+                    rows.append(hit)
+                    cols.append(slots[codes[hit]])
+                    vals.append(np.ones(len(hit), dtype=dtype))
+            if rows:
+                rows, cols, vals = np.concatenate(rows), np.concatenate(cols), np.concatenate(vals)
+            return sp.csr_matrix((vals, (rows, cols)), shape=(n_rows, n_features), dtype=dtype)
+
+        out = np.zeros((n_rows, n_features), dtype=dtype)
+        for col, idx in self.numeric_slots.items():
+            if col in present:
+                out[:, idx] = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=dtype)
+        row_ids = np.arange(n_rows)
+        for col, (categories, slots) in self.dummy_slots.items():
+            if col in present:
+                codes = self._codes(df[col], categories)
+                hit = codes >= 0
+                out[row_ids[hit], slots[codes[hit]]] = 1
+        return out
+
+    def transform_frame(self, df, drop_column=None):
+        """
+        Same as ``transform`` but wrapped in a DataFrame with the model's
+        column names, for estimators that check ``feature_names_in_``
+        """
+        return pd.DataFrame(self.transform(df, drop_column=drop_column),
+                            columns=self.feature_names, index=df.index)
+
+    @staticmethod
+    def _codes(series, categories):
+        # get_dummies ran on ``astype(str)`` values, so match on the same text
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            # Resolve each distinct category once, then gather by code
+            lookup = categories.get_indexer(series.cat.categories.astype(str))
+            missing = categories.get_indexer(["nan"])[0]
+            codes = series.cat.codes.to_numpy()
+            return np.where(codes >= 0, lookup[codes], missing)
+        # Newer pandas keeps NaN through astype(str); spell it 'nan' as before
+        return categories.get_indexer(series.astype(str).fillna("nan"))
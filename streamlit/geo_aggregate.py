@@ -0,0 +1,151 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+TILE_PX = 256
+MAX_LAT = 85.05112878
+
+
+def lonlat_to_pixels(lon, lat, zoom):
+    """Web Mercator pixel coordinates of lon/lat arrays at a zoom level"""
+    world = TILE_PX * 2.0 ** zoom
+    lat = np.clip(lat, -MAX_LAT, MAX_LAT)
+    x = (np.asarray(lon) + 180.0) / 360.0 * world
+    s = np.sin(np.radians(lat))
+    y = (0.5 - np.log((1 + s) / (1 - s)) / (4 * np.pi)) * world
+    return x, y
+
+
+def pixels_to_lonlat(x, y, zoom):
+    world = TILE_PX * 2.0 ** zoom
+    lon = np.asarray(x) / world * 360.0 - 180.0
+    n = np.pi - 2.0 * np.pi * np.asarray(y) / world
+    lat = np.degrees(np.arctan(np.sinh(n)))
+    return lon, lat
+
+
+class AggregationPyramid:
+    """
+    Point counts binned into square screen-space cells for a range of zooms.
+
+    Cells are ``cell_px`` screen pixels wide at their zoom level, so the number
+    of cells a map can show is bounded by the viewport size, not by the number
+    of rows. The finest level is binned from the raw points once; every coarser
+    level is built by merging 2x2 blocks of the level below.
+    """
+
+    def __init__(self, lat, lon, weights=None, min_zoom=8, max_zoom=16, cell_px=16):
+        """
+        :param lat: array-like of latitudes
+        :param lon: array-like of longitudes
+        :param weights: array-like, optional per-point weight (default 1)
+        """
+        lat = np.asarray(lat, dtype=float)
+        lon = np.asarray(lon, dtype=float)
+        keep = np.isfinite(lat) & np.isfinite(lon)
+        lat, lon = lat[keep], lon[keep]
+        weights = np.ones(len(lat)) if weights is None else np.asarray(weights, dtype=float)[keep]
+
+        self.min_zoom = min_zoom
+        self.max_zoom = max_zoom
+        self.cell_px = cell_px
+        self.n_points = len(lat)
+        self.bounds = ((lat.min(), lon.min()), (lat.max(), lon.max())) if len(lat) else None
+        self.levels = {}
+
+        x, y = lonlat_to_pixels(lon, lat, max_zoom)
+        ix = np.floor(x / cell_px).astype(np.int64)
+        iy = np.floor(y / cell_px).astype(np.int64)
+        level = self._reduce(ix, iy, weights)
+        self.levels[max_zoom] = level
+        for zoom in range(max_zoom - 1, min_zoom - 1, -1):
+            level = self._reduce(level["ix"].to_numpy() // 2, level["iy"].to_numpy() // 2,
+                                 level["weight"].to_numpy())
+            self.levels[zoom] = level
+
+    @staticmethod
+    def _reduce(ix, iy, weights):
+        grouped = (pd.DataFrame({"ix": ix, "iy": iy, "weight": weights})
+                   .groupby(["ix", "iy"], sort=False, as_index=False)["weight"].sum())
+        return grouped
+
+    def fit_zoom(self, width_px=1200, height_px=700):
+        """Deepest zoom at which the whole dataset fits in the viewport"""
+        if self.bounds is None:
+            return self.min_zoom
+        (lat0, lon0), (lat1, lon1) = self.bounds
+        for zoom in range(self.max_zoom, self.min_zoom - 1, -1):
+            x, y = lonlat_to_pixels(np.array([lon0, lon1]), np.array([lat0, lat1]), zoom)
+            if abs(x[1] - x[0]) <= width_px and abs(y[1] - y[0]) <= height_px:
+                return zoom
+        return self.min_zoom
+
+    def level(self, zoom, bounds=None):
+        """
+        Cell indices and weights at a zoom level
+
+        :param bounds: (south, west, north, east), keep only cells touching
+                       this box; the map's viewport keeps the payload bounded
+                       by screen size at any zoom
+        :return: (zoom actually used, pandas.DataFrame with ix, iy, weight)
+        """
+        zoom = min(max(zoom, self.min_zoom), self.max_zoom)
+        level = self.levels[zoom]
+        if bounds is not None:
+            south, west, north, east = bounds
+            x, y = lonlat_to_pixels(np.array([west, east]), np.array([north, south]), zoom)
+            ix0, ix1 = np.floor(x / self.cell_px).astype(np.int64)
+            iy0, iy1 = np.floor(y / self.cell_px).astype(np.int64)
+            ix, iy = level["ix"].to_numpy(), level["iy"].to_numpy()
+            level = level[(ix >= ix0) & (ix <= ix1) & (iy >= iy0) & (iy <= iy1)]
+        return zoom, level
+
+    def cells(self, zoom, bounds=None):
+        """
+        Aggregated cells at a zoom level
+
+        :param bounds: (south, west, north, east), optional viewport to clip to
+        :return: pandas.DataFrame with lat, lon (cell centre) and weight columns
+        """
+        zoom, level = self.level(zoom, bounds)
+        lon, lat = pixels_to_lonlat((level["ix"] + 0.5) * self.cell_px,
+                                    (level["iy"] + 0.5) * self.cell_px, zoom)
+        return pd.DataFrame({"lat": lat, "lon": lon, "weight": level["weight"].to_numpy()})
+
+    def heat_data(self, zoom, bounds=None):
+        """[lat, lon, weight] rows for folium's HeatMap, weights scaled to 0..1"""
+        cells = self.cells(zoom, bounds)
+        if cells.empty:
+            return []
+        cells["weight"] = cells["weight"] / cells["weight"].max()
+        return cells[["lat", "lon", "weight"]].values.tolist()
+
+    def cells_geojson(self, zoom, bounds=None):
+        """Cell squares as a GeoJSON FeatureCollection with a ``weight`` property"""
+        zoom, level = self.level(zoom, bounds)
+        ix = level["ix"].to_numpy()
+        iy = level["iy"].to_numpy()
+        lon0, lat0 = pixels_to_lonlat(ix * self.cell_px, (iy + 1) * self.cell_px, zoom)
+        lon1, lat1 = pixels_to_lonlat((ix + 1) * self.cell_px, iy * self.cell_px, zoom)
+        features = []
+        for a, b, c, d, w in zip(lon0.tolist(), lat0.tolist(), lon1.tolist(), lat1.tolist(),
+                                 level["weight"].tolist()):
+            features.append({
+                "type": "Feature",
+                "properties": {"weight": w},
+                "geometry": {"type": "Polygon",
+                             "coordinates": [[[a, b], [c, b], [c, d], [a, d], [a, b]]]},
+            })
+        return {"type": "FeatureCollection", "features": features}
+
+
+def zoom_center(pyramid):
+    """Centre of the pyramid's bounding box as [lat, lon]"""
+    (lat0, lon0), (lat1, lon1) = pyramid.bounds
+    return [(lat0 + lat1) / 2, (lon0 + lon1) / 2]
+
+
+def log_scale(weight, max_weight):
+    # Densities are heavy-tailed, so colour on a log scale
+    return math.log1p(weight) / math.log1p(max_weight) if max_weight > 0 else 0.0
@@ -0,0 +1,133 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from disk_cache import DiskCache, content_fingerprint
+from dtype_plan import compact_frame
+from instrument import mark_cache
+
+# Every page parses an upload at most once: the parsed table is stored as an
+# uncompressed Arrow IPC file keyed by the upload's content hash, and read
+# back memory-mapped.
+_cache = DiskCache("tables", max_bytes=int(os.environ.get("FYP_TABLE_CACHE_BYTES", 4 * 1024 ** 3)))
+TABLE_SUFFIX = ".arrow"
+
+# Recently used frames, shared by all sessions in this process. Treat them as
+# read-only: copy before mutating.
+_frames = OrderedDict()
+_frames_max = 4
+_file_ids = {}
+_reports = {}
+_lock = threading.Lock()
+
+
+def parse_upload(source, name):
+    """
+    Parse a CSV/XLSX/XLS file into a DataFrame
+
+    :return: pandas.DataFrame, or None if the extension is not tabular
+    """
+    fname = name.lower()
+    if fname.endswith(('.xlsx', '.xls')):
+        return pd.read_excel(source)
+    elif fname.endswith('.csv'):
+        return pd.read_csv(source)
+    return None
+
+
+def upload_fingerprint(uploaded_file):
+    """Content hash of an upload, hashed once per Streamlit file id"""
+    file_id = getattr(uploaded_file, "file_id", None)
+    if file_id is not None and file_id in _file_ids:
+        return _file_ids[file_id]
+    fingerprint = content_fingerprint(uploaded_file.getbuffer())
+    if file_id is not None:
+        _file_ids[file_id] = fingerprint
+    return fingerprint
+
+
+def cached_table_path(fingerprint):
+    """Path of the cached Arrow file for a fingerprint, or None"""
+    return _cache.get(fingerprint, TABLE_SUFFIX)
+
+
+def read_table(path):
+    """Load a cached Arrow file memory-mapped; numeric columns are not copied"""
+    import pyarrow as pa
+
+    with pa.memory_map(path, "r") as source:
+        table = pa.ipc.open_file(source).read_all()
+    return table.to_pandas(split_blocks=True)
+
+
+def memory_report(fingerprint):
+    """
+    Memory before/after dtype compaction for an ingested upload
+
+    :return: dict with before_mb, after_mb and the changed columns, or None
+    """
+    if fingerprint in _reports:
+        return _reports[fingerprint]
+    path = _cache.get(fingerprint, ".json")
+    if path is None:
+        return None
+    with open(path) as f:
+        _reports[fingerprint] = json.load(f)
+    return _reports[fingerprint]
+
+
+def _write_table(df, path):
+    import pyarrow.feather as feather
+
+    feather.write_feather(df, path, compression="uncompressed")
+
+
+def _dump_json(obj, path):
+    with open(path, "w") as f:
+        json.dump(obj, f)
+
+
+def read_upload(uploaded_file):
+    """
+    Load a tabular upload through the shared ingestion cache
+
+    Dtypes are compacted at parse time (see dtype_plan.compact_frame), so
+    callers get categoricals and downcast numerics.
+
+    :param uploaded_file: Streamlit UploadedFile (CSV/XLSX/XLS)
+    :return: (pandas.DataFrame or None, fingerprint str)
+    """
+    fingerprint = upload_fingerprint(uploaded_file)
+    with _lock:
+        if fingerprint in _frames:
+            _frames.move_to_end(fingerprint)
+            mark_cache(True)
+            return _frames[fingerprint], fingerprint
+
+    path = cached_table_path(fingerprint)
+    mark_cache(path is not None)
+    if path is not None:
+        df = read_table(path)
+    else:
+        uploaded_file.seek(0)
+        df = parse_upload(uploaded_file, uploaded_file.name)
+        if df is None:
+            return None, fingerprint
+        # Compact dtypes once here so every page works on the small frame
+        df, report = compact_frame(df)
+        _reports[fingerprint] = report
+        _cache.put(fingerprint, ".json", lambda p: _dump_json(report, p))
+        try:
+            _cache.put(fingerprint, TABLE_SUFFIX, lambda p: _write_table(df, p))
+        except Exception:
+            # Mixed-type columns Arrow cannot store: serve the parsed frame uncached
+            pass
+
+    with _lock:
+        _frames[fingerprint] = df
+        while len(_frames) > _frames_max:
+            _frames.popitem(last=False)
+    return df, fingerprint
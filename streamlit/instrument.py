@@ -0,0 +1,100 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Set FYP_METRICS_LOG to a file path to append every stage record as JSON lines
+METRICS_LOG = os.environ.get("FYP_METRICS_LOG")
+
+_local = threading.local()
+_log_lock = threading.Lock()
+
+
+def rss_bytes():
+    """Resident set size of this process, or None if it cannot be read"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def begin_run(page):
+    """
+    Start a fresh list of stage records for this script run
+
+    :param page: str, page name recorded with every stage
+    """
+    _local.page = page
+    _local.run_id = f"{page}-{time.time():.3f}"
+    _local.records = []
+    _local.active = []
+
+
+def run_records():
+    return list(getattr(_local, "records", []))
+
+
+def mark_cache(hit):
+    """Record a cache hit/miss on the innermost stage currently running"""
+    active = getattr(_local, "active", None)
+    if active:
+        active[-1]["cache"] = "hit" if hit else "miss"
+
+
+@contextmanager
+def stage(name, cached=False):
+    """
+    Time a block and record its wall time and RSS delta
+
+    :param name: str, stage label (e.g. 'ingest', 'predict')
+    :param cached: bool, the block calls a cache; it counts as a hit unless
+                   the cached function calls ``mark_cache(False)`` on a miss
+    """
+    if not hasattr(_local, "records"):
+        begin_run("unknown")
+    record = {"page": _local.page, "run": _local.run_id, "stage": name,
+              "cache": "hit" if cached else None}
+    _local.active.append(record)
+    rss_before = rss_bytes()
+    t0 = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record["seconds"] = time.perf_counter() - t0
+        rss_after = rss_bytes()
+        record["rss_delta_mb"] = ((rss_after - rss_before) / 1e6
+                                  if None not in (rss_before, rss_after) else None)
+        record["rss_mb"] = rss_after / 1e6 if rss_after is not None else None
+        record["timestamp"] = time.time()
+        _local.active.pop()
+        _local.records.append(record)
+        if METRICS_LOG:
+            with _log_lock, open(METRICS_LOG, "a") as f:
+                f.write(json.dumps(record) + "\n")
+
+
+def render_panel():
+    """Optional sidebar panel listing this run's stages (call at the end of a page)"""
+    import pandas as pd
+    import streamlit as st
+
+    st.sidebar.markdown("---")
+    if not st.sidebar.checkbox("⏱️ Show performance panel", key="perf_panel"):
+        return
+    records = run_records()
+    if not records:
+        st.sidebar.caption("No stages recorded on this run.")
+        return
+    table = pd.DataFrame(records)[["stage", "seconds", "cache", "rss_delta_mb"]]
+    st.sidebar.dataframe(table.round(3), hide_index=True, use_container_width=True)
+    st.sidebar.caption(f"Total {table['seconds'].sum():.2f}s"
+                       + (f" · logging to {METRICS_LOG}" if METRICS_LOG else ""))
+    st.sidebar.download_button("⬇️ Export run metrics", "\n".join(json.dumps(r) for r in records),
+                               file_name="metrics.jsonl", mime="application/json")
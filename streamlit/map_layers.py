@@ -0,0 +1,116 @@
+import folium
+import pandas as pd
+from branca.colormap import LinearColormap
+from folium.plugins import FastMarkerCluster, HeatMap
+
+from geo_aggregate import log_scale, zoom_center
+
+# Marker built client-side per point; popups are pre-rendered HTML strings
+_POINT_CALLBACK = """
+function (row) {
+    var marker = L.circleMarker(new L.LatLng(row[0], row[1]),
+                                {radius: 6, color: '%s', fillOpacity: 0.7});
+    if (row[2]) { marker.bindPopup(row[2]); }
+    return marker;
+}
+"""
+
+
+def build_popups(df, popup_columns):
+    # One vectorized string concat per column instead of one format per row
+    if not popup_columns:
+        return pd.Series("", index=df.index)
+    parts = []
+    for col in popup_columns:
+        values = df[col].astype(str) if col in df.columns else pd.Series("N/A", index=df.index)
+        parts.append(f"<b>{col}:</b> " + values)
+    popups = parts[0]
+    for part in parts[1:]:
+        popups = popups + "<br>" + part
+    return popups
+
+
+# Function to create map markers
+def marker_map(df, lat_col, lon_col, popup_columns, zoom_start=12, color="blue", icon="info-sign"):
+    center = [df[lat_col].mean(), df[lon_col].mean()]
+    m = folium.Map(location=center, zoom_start=zoom_start)
+    for _, row in df.iterrows():
+        popup = "<br>".join([f"<b>{col}:</b> {row.get(col, 'N/A')}" for col in popup_columns])
+        folium.Marker(location=[row[lat_col], row[lon_col]], popup=popup,
+                      icon=folium.Icon(color=color, icon=icon)).add_to(m)
+    return m
+
+
+# Function to create heatmap
+def heatmap(df, lat_col, lon_col, zoom_start=12):
+    center = [df[lat_col].mean(), df[lon_col].mean()]
+    m = folium.Map(location=center, zoom_start=zoom_start)
+    data = df[[lat_col, lon_col]].dropna().values.tolist()
+    HeatMap(data).add_to(m)
+    return m
+
+
+# Function to create a clustered point layer for the whole dataset
+def cluster_map(df, lat_col, lon_col, popup_columns, color="blue", zoom_start=12):
+    center = [df[lat_col].mean(), df[lon_col].mean()]
+    m = folium.Map(location=center, zoom_start=zoom_start)
+    data = pd.DataFrame({
+        "lat": df[lat_col].to_numpy(dtype=float),
+        "lon": df[lon_col].to_numpy(dtype=float),
+        "popup": build_popups(df, popup_columns).to_numpy(),
+    }).values.tolist()
+    FastMarkerCluster(data, callback=_POINT_CALLBACK % color).add_to(m)
+    return m
+
+
+# Empty map for the viewport mode; points arrive as a separate layer
+def base_map(center, zoom):
+    return folium.Map(location=center, zoom_start=zoom)
+
+
+# Function to create a point layer that st_folium can swap without redrawing the map
+def point_layer(df, lat_col, lon_col, popup_columns, color="blue"):
+    lat = df[lat_col].to_numpy(dtype=float).tolist()
+    lon = df[lon_col].to_numpy(dtype=float).tolist()
+    popups = build_popups(df, popup_columns).tolist()
+    features = [{"type": "Feature", "properties": {"popup": p},
+                 "geometry": {"type": "Point", "coordinates": [x, y]}}
+                for y, x, p in zip(lat, lon, popups)]
+    group = folium.FeatureGroup(name="Points")
+    folium.GeoJson(
+        {"type": "FeatureCollection", "features": features},
+        marker=folium.CircleMarker(radius=6, color=color, fill=True, fill_opacity=0.7),
+        popup=folium.GeoJsonPopup(fields=["popup"], labels=False) if popup_columns else None,
+    ).add_to(group)
+    return group
+
+
+# Function to create heatmap (and optional density cells) from pre-aggregated cells
+def aggregated_heatmap(pyramid, zoom, show_cells=False, view=None):
+    """
+    :param view: dict with ``center``, ``zoom`` and ``bounds`` (see
+                 tile_index.folium_view); only cells inside ``bounds`` are sent
+    """
+    if view is None:
+        m = folium.Map(location=zoom_center(pyramid), zoom_start=zoom)
+        bounds = None
+    else:
+        m = folium.Map(location=view["center"], zoom_start=view["zoom"])
+        bounds = view["bounds"]
+    HeatMap(pyramid.heat_data(zoom, bounds)).add_to(m)
+    if show_cells:
+        cells = pyramid.cells_geojson(zoom, bounds)
+        max_weight = max((f["properties"]["weight"] for f in cells["features"]), default=0)
+        colormap = LinearColormap(["#ffffb2", "#fd8d3c", "#bd0026"], vmin=0, vmax=1,
+                                  caption="Point density (log scale)")
+        folium.GeoJson(
+            cells, name="Density cells",
+            style_function=lambda f: {
+                "fillColor": colormap(log_scale(f["properties"]["weight"], max_weight)),
+                "color": None, "weight": 0, "fillOpacity": 0.5,
+            },
+            tooltip=folium.GeoJsonTooltip(fields=["weight"], aliases=["Points"]),
+        ).add_to(m)
+        colormap.add_to(m)
+        folium.LayerControl().add_to(m)
+    return m
@@ -0,0 +1,107 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from batch import iter_frame_chunks
+from model_families import model_path, required_columns
+from model_registry import get_model
+
+
+def model_label(family, name):
+    return f"{family}/{name}"
+
+
+class ComparisonResult:
+    """
+    Side-by-side output of several models on one upload
+
+    :ivar predictions: DataFrame, one column per model label
+    :ivar timings: dict label -> {"encode_seconds", "predict_seconds", "rows"}
+    :ivar wall_seconds: float, end-to-end time of the comparison
+    """
+
+    def __init__(self, predictions, timings, wall_seconds):
+        self.predictions = predictions
+        self.timings = timings
+        self.wall_seconds = wall_seconds
+
+    def agreement(self):
+        """Pairwise share of rows on which two models predict the same label"""
+        labels = list(self.predictions.columns)
+        values = {c: self.predictions[c].astype(str).to_numpy() for c in labels}
+        matrix = pd.DataFrame(1.0, index=labels, columns=labels)
+        for i, a in enumerate(labels):
+            for b in labels[i + 1:]:
+                if len(values[a]):
+                    matrix.loc[a, b] = matrix.loc[b, a] = float(np.mean(values[a] == values[b]))
+        return matrix
+
+    def all_agree(self):
+        """Boolean Series, True where every model gives the same label"""
+        as_text = self.predictions.astype(str)
+        return as_text.eq(as_text.iloc[:, 0], axis=0).all(axis=1)
+
+    def latency_table(self):
+        table = pd.DataFrame(self.timings).T
+        table["rows_per_second"] = table["rows"] / table["predict_seconds"].replace(0, np.nan)
+        return table
+
+
+def compare_models(df, models, drop_column=None, chunksize=50_000, workers=None):
+    """
+    Score one upload with several models at once
+
+    Models that share a feature layout (same training columns and family
+    columns) share one encoded matrix per chunk, so the upload is encoded once
+    per schema rather than once per model. The models then score each chunk
+    concurrently in a thread pool; tree inference releases the GIL, so the
+    wall time stays close to that of the slowest model.
+
+    :param df: pandas.DataFrame, the upload
+    :param models: list of (family, model name) pairs
+    :param drop_column: str, service label column to ignore
+    :param workers: int, threads (default: one per model)
+    :return: ComparisonResult
+    """
+    start = time.perf_counter()
+    entries = {model_label(f, n): (f, get_model(model_path(f, n))) for f, n in models}
+    schemas = {}
+    for label, (family, entry) in entries.items():
+        encoder = entry.encoder_for(required_columns(family))
+        key = (tuple(encoder.feature_names), tuple(encoder.columns))
+        schemas.setdefault(key, (encoder, []))[1].append(label)
+
+    timings = {label: {"encode_seconds": 0.0, "predict_seconds": 0.0, "rows": 0} for label in entries}
+    outputs = {label: [] for label in entries}
+
+    def encode(encoder, chunk):
+        t0 = time.perf_counter()
+        return encoder.transform_frame(chunk, drop_column=drop_column), time.perf_counter() - t0
+
+    def score(label, features):
+        t0 = time.perf_counter()
+        predictions = entries[label][1].model.predict(features)
+        return predictions, time.perf_counter() - t0
+
+    with ThreadPoolExecutor(workers or len(entries) or 1) as pool:
+        for chunk in iter_frame_chunks(df, chunksize):
+            encoded = {key: pool.submit(encode, encoder, chunk) for key, (encoder, _) in schemas.items()}
+            scoring = {}
+            for key, (_, labels) in schemas.items():
+                features, encode_s = encoded[key].result()
+                for label in labels:
+                    # Shared encoding time is charged to every model using it
+                    timings[label]["encode_seconds"] += encode_s
+                    scoring[label] = pool.submit(score, label, features)
+            for label, future in scoring.items():
+                predictions, predict_s = future.result()
+                timings[label]["predict_seconds"] += predict_s
+                timings[label]["rows"] += len(chunk)
+                outputs[label].append(np.asarray(predictions))
+
+    predictions = pd.DataFrame(
+        {label: np.concatenate(parts) if parts else np.empty(0) for label, parts in outputs.items()},
+        index=df.index)
+    return ComparisonResult(predictions, timings, time.perf_counter() - start)
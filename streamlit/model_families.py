@@ -0,0 +1,60 @@
+import os
+
+# Each predict page serves one family of models trained on its own columns
+MODEL_FAMILIES = {
+    "base": {
+        "path": "streamlit/models/{name}.pkl",
+        "columns": [
+            'Gender', 'One_Way_Permit_Application_Category',
+            'Social_Welfare_Department', 'Receive_Communications',
+            'age', 'Year', 'Month', 'Day',
+            'address_latitude', 'address_longitude', 'origin_address_latitude',
+            'origin_address_longitude'
+        ],
+        "numeric": ['age', 'Year', 'Month', 'Day',
+                    'address_latitude', 'address_longitude',
+                    'origin_address_latitude', 'origin_address_longitude'],
+    },
+    "2024": {
+        "path": "streamlit/mmodels/{name}_2024.pkl",
+        "columns": [
+            'Gender', 'One_Way_Permit_Application_Category',
+            'Social_Welfare_Department', 'Receive_Communications',
+            'Knows_Cantonese', 'Education',
+            'Had_Long_Term_Work_in_Mainland_Before_Arrival', 'Occupation',
+            'Settlement_Father', 'Settlement_Mother',
+            'Number_of_Biological_Children', 'age', 'Year', 'Month', 'Day',
+            'address_latitude', 'address_longitude', 'origin_address_latitude',
+            'origin_address_longitude'
+        ],
+        "numeric": ['Number_of_Biological_Children', 'age', 'Year', 'Month', 'Day',
+                    'address_latitude', 'address_longitude',
+                    'origin_address_latitude', 'origin_address_longitude'],
+    },
+}
+
+MODEL_NAMES = ["RandomForest", "XGBoost"]
+
+
+def model_path(family, name):
+    """
+    Path of a pickled model, relative to the repository root
+
+    :param family: str, key of MODEL_FAMILIES ('base' or '2024')
+    :param name: str, model name as shown in the UI (e.g. 'RandomForest')
+    """
+    return MODEL_FAMILIES[family]["path"].format(name=name.lower())
+
+
+def available_models():
+    """(family, name) of every model whose .pkl exists"""
+    return [(family, name) for family in MODEL_FAMILIES for name in MODEL_NAMES
+            if os.path.exists(model_path(family, name))]
+
+
+def required_columns(family):
+    return list(MODEL_FAMILIES[family]["columns"])
+
+
+def numeric_columns(family):
+    return list(MODEL_FAMILIES[family]["numeric"])
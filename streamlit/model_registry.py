@@ -0,0 +1,145 @@
+import os
+import threading
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from features import FeatureEncoder, model_feature_names
+from instrument import mark_cache, rss_bytes
+
+
+class ModelEntry:
+    """A loaded model plus what it cost to load"""
+
+    def __init__(self, path, mtime, model, load_seconds, resident_bytes):
+        self.path = path
+        self.mtime = mtime
+        self.model = model
+        self.load_seconds = load_seconds
+        self.resident_bytes = resident_bytes
+        self.warmup_seconds = None
+        self._encoders = {}
+
+    def encoder_for(self, columns):
+        """FeatureEncoder for this model, built once per column set"""
+        key = tuple(columns)
+        if key not in self._encoders:
+            self._encoders[key] = FeatureEncoder.from_model(self.model, columns)
+        return self._encoders[key]
+
+    def warm_up(self):
+        # One tiny prediction pulls the tree arrays into memory and triggers
+        # any lazy initialisation before the first real request
+        features = model_feature_names(self.model)
+        row = pd.DataFrame(np.zeros((1, len(features)), dtype=np.float32), columns=features)
+        t0 = time.perf_counter()
+        self.model.predict(row)
+        self.warmup_seconds = time.perf_counter() - t0
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "file_mb": os.path.getsize(self.path) / 1e6 if os.path.exists(self.path) else None,
+            "load_seconds": self.load_seconds,
+            "warmup_seconds": self.warmup_seconds,
+            "resident_mb": self.resident_bytes / 1e6 if self.resident_bytes is not None else None,
+        }
+
+
+def predict_with_proba(model, features):
+    """
+    Predictions and class probabilities from one pass where possible
+
+    Forests predict the argmax of ``predict_proba``, so their labels are
+    taken from the probabilities instead of traversing the trees twice.
+
+    :return: (predictions array, probabilities array or None)
+    """
+    if not hasattr(model, "predict_proba"):
+        return model.predict(features), None
+    proba = model.predict_proba(features)
+    from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+
+    if isinstance(model, (RandomForestClassifier, ExtraTreesClassifier)):
+        return model.classes_.take(np.argmax(proba, axis=1)), proba
+    return model.predict(features), proba
+
+
+_entries = {}
+_lock = threading.Lock()
+_preload_started = False
+
+
+def get_model(path, warm_up=True):
+    """
+    Return the registry entry for a pickled model, loading it if needed
+
+    Entries are keyed by absolute path and file mtime, so replacing a ``.pkl``
+    on disk is picked up on the next call without restarting the server.
+    Each process holds its own copy: sklearn trees copy their node arrays on
+    unpickling and XGBoost keeps its booster as raw bytes, so memory-mapping
+    the file shares nothing. To share one copy between worker processes, load
+    it in the parent before forking (see score_batch.py).
+
+    :param path: str, path to the ``.pkl`` file
+    :param warm_up: bool, run one prediction right after loading
+    :return: ModelEntry
+    """
+    key = os.path.abspath(path)
+    mtime = os.path.getmtime(key)
+    entry = _entries.get(key)
+    if entry is not None and entry.mtime == mtime:
+        mark_cache(True)
+        return entry
+
+    with _lock:
+        entry = _entries.get(key)
+        if entry is not None and entry.mtime == mtime:
+            mark_cache(True)
+            return entry
+        mark_cache(False)
+        rss_before = rss_bytes()
+        t0 = time.perf_counter()
+        model = joblib.load(key)
+        load_seconds = time.perf_counter() - t0
+        rss_after = rss_bytes()
+        resident = rss_after - rss_before if None not in (rss_before, rss_after) else None
+        entry = ModelEntry(key, mtime, model, load_seconds, resident)
+        if warm_up:
+            entry.warm_up()
+        # Replaces any entry left over from an older mtime
+        _entries[key] = entry
+    return entry
+
+
+def preload_models(paths):
+    """
+    Load and warm up models in a background thread, once per process
+
+    Called when the app starts so the first prediction request finds its
+    model loaded and warm instead of paying the load and warm-up itself.
+
+    :param paths: list of ``.pkl`` paths
+    """
+    global _preload_started
+    with _lock:
+        if _preload_started:
+            return
+        _preload_started = True
+
+    def run():
+        for path in paths:
+            try:
+                get_model(path)
+            except Exception:
+                # The page that needs the model reports the error when it loads it
+                pass
+
+    threading.Thread(target=run, name="model-preload", daemon=True).start()
+
+
+def registry_stats():
+    """Load time and resident size of every model loaded in this process"""
+    return [entry.stats() for entry in _entries.values()]
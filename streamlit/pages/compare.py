@@ -0,0 +1,69 @@
+import streamlit as st
+from model_families import available_models
+from model_compare import compare_models, model_label
+from ingest import read_upload
+from instrument import begin_run, render_panel, stage
+
+st.set_page_config("Model Comparison", layout="wide")
+st.title("⚖️ Model Comparison")
+begin_run("compare")
+
+st.sidebar.header("Comparison Settings")
+uploaded_file = st.sidebar.file_uploader("Upload File (CSV or XLSX)", type=["csv", "xlsx"])
+
+# Every model file that exists, across both families
+labels = {model_label(family, name): (family, name) for family, name in available_models()}
+chosen = st.sidebar.multiselect("Models to compare", list(labels), default=list(labels))
+
+if uploaded_file:
+    try:
+        with stage("ingest"):
+            df, fingerprint = read_upload(uploaded_file)
+        st.session_state.df = df
+        st.session_state.df_fingerprint = fingerprint
+    except Exception as e:
+        st.error(f"Failed to read file: {e}")
+
+if 'df' in st.session_state and chosen:
+    df = st.session_state.df
+    st.write("📄 Uploaded Data Preview", df.head())
+    drop_col = st.selectbox("Which column is the service label?", ["None"] + list(df.columns))
+    drop_col = None if drop_col == "None" else drop_col
+
+    key = (st.session_state.get("df_fingerprint"), tuple(chosen), drop_col)
+    if st.button("Compare models"):
+        with stage("compare_models"), st.spinner(f"Scoring {len(df):,} rows with {len(chosen)} models..."):
+            try:
+                result = compare_models(df, [labels[c] for c in chosen], drop_column=drop_col)
+                st.session_state.compare_result = {"key": key, "result": result}
+            except Exception as e:
+                st.error(f"Comparison error: {e}")
+
+    stored = st.session_state.get("compare_result")
+    if stored and stored["key"] == key:
+        result = stored["result"]
+        agree = result.all_agree()
+        st.subheader("⏱️ Latency")
+        st.caption(f"All models together: {result.wall_seconds:.2f}s wall time")
+        st.dataframe(result.latency_table().round(3), use_container_width=True)
+
+        st.subheader("🤝 Agreement")
+        st.metric("Rows where every model agrees", f"{agree.mean():.1%}" if len(agree) else "n/a")
+        st.dataframe(result.agreement().style.format("{:.1%}"), use_container_width=True)
+
+        st.subheader("🔮 Side-by-side Predictions")
+        side_by_side = result.predictions
+        if drop_col:
+            side_by_side = side_by_side.join(df[[drop_col]])
+        if st.checkbox("Only rows where the models disagree"):
+            side_by_side = side_by_side[~agree]
+        st.dataframe(side_by_side.head(1000), use_container_width=True)
+        # Serialized only when the button is clicked, not on every rerun
+        st.download_button("⬇️ Download comparison", lambda: side_by_side.to_csv(index=False),
+                           file_name="model_comparison.csv", mime="text/csv")
+elif not chosen:
+    st.info("Select at least one model in the sidebar.")
+else:
+    st.info("Upload a dataset in the sidebar to compare models.")
+
+render_panel()
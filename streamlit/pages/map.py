@@ -2,12 +2,15 @@
 
 import streamlit as st
 import pandas as pd
-import folium
-import tempfile
-import os
-import zipfile
 from streamlit_folium import st_folium
-from folium.plugins import HeatMap
+import map_layers
+from geo_aggregate import AggregationPyramid, zoom_center
+from poi_join import PoiIndex
+from tile_index import TileIndex, folium_view, view_bounds
+from shape_cache import load_shapefile
+from ingest import read_upload, upload_fingerprint
+from dataset import DatasetHandle, dataset_cache
+from instrument import begin_run, render_panel, stage
 
 try:
     import geopandas as gpd
@@ -16,82 +19,89 @@ except ImportError:
 
 st.set_page_config(layout="wide")
 st.title("🗺️ Geospatial Visualization")
+begin_run("map")
 
-# Caching function for loading data
-def _load_tabular(uploaded_file):
-    fname = uploaded_file.name.lower()
-    if fname.endswith(('.xlsx', '.xls')):
-        return pd.read_excel(uploaded_file)
-    elif fname.endswith('.csv'):
-        return pd.read_csv(uploaded_file)
-    return None
-
-@st.cache_data
-# Load CSV/Excel or unpack and load Shapefile
+# Load CSV/Excel or unpack and load Shapefile, fingerprinted once per upload
 def load_data(uploaded_file):
     try:
         fname = uploaded_file.name.lower()
-        # Tabular data
-        tab = _load_tabular(uploaded_file)
-        if tab is not None:
-            return tab
+        # Tabular data, through the shared ingestion cache
+        if fname.endswith(('.csv', '.xlsx', '.xls')):
+            tab, fingerprint = read_upload(uploaded_file)
+            return DatasetHandle(tab, fingerprint) if tab is not None else None
         # Geospatial data via shapefile
-        if gpd and fname.endswith('.shp'):
-            return gpd.read_file(uploaded_file)
-        if gpd and fname.endswith('.zip'):
-            # Write zip to temp and unpack
-            temp_dir = tempfile.mkdtemp()
-            zpath = os.path.join(temp_dir, uploaded_file.name)
-            with open(zpath, 'wb') as f:
-                f.write(uploaded_file.getbuffer())
-            with zipfile.ZipFile(zpath, 'r') as z:
-                z.extractall(temp_dir)
-            # Find .shp
-            shp_files = [os.path.join(temp_dir, f) for f in os.listdir(temp_dir) if f.lower().endswith('.shp')]
-            if not shp_files:
-                st.sidebar.error("❌ No .shp file found in ZIP archive.")
-                return None
-            gdf = gpd.read_file(shp_files[0])
-            # Extract centroid coords
-            gdf['lat'] = gdf.geometry.centroid.y
-            gdf['lon'] = gdf.geometry.centroid.x
-            return gdf
+        if gpd and fname.endswith(('.shp', '.zip')):
+            # Content-addressed cache: re-uploads skip extraction and parsing
+            return DatasetHandle(load_shapefile(uploaded_file), upload_fingerprint(uploaded_file))
     except Exception as e:
         st.sidebar.error(f"❌ Error loading file: {e}")
     return None
 
-# Function to create map markers
-@st.cache_data
-def create_map(df, lat_col, lon_col, popup_columns, zoom_start=12):
-    center = [df[lat_col].mean(), df[lon_col].mean()]
-    m = folium.Map(location=center, zoom_start=zoom_start)
-    for _, row in df.iterrows():
-        popup = "<br>".join([f"<b>{col}:</b> {row.get(col, 'N/A')}" for col in popup_columns])
-        folium.Marker(location=[row[lat_col], row[lon_col]], popup=popup,
-                      icon=folium.Icon(color="blue", icon="info-sign")).add_to(m)
-    return m
-
-# Function to create heatmap
-@st.cache_data
-def create_heatmap(df, lat_col, lon_col, zoom_start=12):
-    center = [df[lat_col].mean(), df[lon_col].mean()]
-    m = folium.Map(location=center, zoom_start=zoom_start)
-    data = df[[lat_col, lon_col]].dropna().values.tolist()
-    HeatMap(data).add_to(m)
-    return m
+def coordinate_rows(data, lat_col, lon_col):
+    # Rows with usable coordinates; the handle's fingerprint is derived from
+    # the upload's and the column names, so no data is hashed
+    df = data.df.dropna(subset=[lat_col, lon_col])
+    df[lat_col] = pd.to_numeric(df[lat_col], errors='coerce')
+    df[lon_col] = pd.to_numeric(df[lon_col], errors='coerce')
+    return data.derive(df.dropna(subset=[lat_col, lon_col]), 'coords', lat_col, lon_col)
+
+# Map builders live in map_layers.py. Every cached stage takes a DatasetHandle
+# and is keyed by its fingerprint, so cache hits never hash or pickle the data
+@dataset_cache(max_entries=8)
+def create_map(data, lat_col, lon_col, popup_columns, zoom_start=12):
+    return map_layers.marker_map(data.df, lat_col, lon_col, popup_columns, zoom_start=zoom_start)
+
+@dataset_cache(max_entries=8)
+def create_heatmap(data, lat_col, lon_col, zoom_start=12):
+    return map_layers.heatmap(data.df, lat_col, lon_col, zoom_start=zoom_start)
+
+@dataset_cache(max_entries=8)
+def create_cluster_map(data, lat_col, lon_col, popup_columns, color="blue", zoom_start=12):
+    return map_layers.cluster_map(data.df, lat_col, lon_col, popup_columns, color=color, zoom_start=zoom_start)
+
+# Binned once per dataset; every heatmap render reuses the pyramid
+@dataset_cache(max_entries=4)
+def build_pyramid(data, lat_col, lon_col):
+    return AggregationPyramid(data.df[lat_col], data.df[lon_col])
+
+def create_aggregated_heatmap(pyramid, zoom, show_cells=False, view=None):
+    return map_layers.aggregated_heatmap(pyramid, zoom, show_cells, view)
+
+# Points sorted by map tile once per dataset; viewport queries reuse it
+@dataset_cache(max_entries=4)
+def build_tile_index(data, lat_col, lon_col):
+    return TileIndex(data.df[lat_col], data.df[lon_col])
+
+# Built fresh every run: st_folium adds the points layer to the map it is
+# given, so a shared cached map would collect every session's layers. Equal
+# arguments render the same map script, so st_folium still only swaps the layer
+def create_base_map(center_lat, center_lon, zoom):
+    return map_layers.base_map([center_lat, center_lon], zoom)
+
+# Spatial index built once per POI upload / column choice
+@dataset_cache(max_entries=4)
+def build_poi_index(poi, lat_col, lon_col, label_col=None):
+    labels = poi.df[label_col].to_numpy() if label_col else None
+    return PoiIndex(poi.df[lat_col], poi.df[lon_col], labels)
+
+def poi_join_key(main, lat_col, lon_col, poi_fingerprint, poi_lat_col, poi_lon_col):
+    # Identifies which main and POI datasets / coordinates a stored join belongs to
+    return (main.fingerprint, lat_col, lon_col, poi_fingerprint, poi_lat_col, poi_lon_col)
+
+def current_poi_key():
+    # The POI uploader sits further down the page; its last file and column
+    # choices are already in session state (fingerprints are cached per file)
+    upload = st.session_state.get('poi')
+    fingerprint = upload_fingerprint(upload) if upload is not None else None
+    return fingerprint, st.session_state.get('lat_poi'), st.session_state.get('lon_poi')
 
 def create_map_from_gdf(gdf, lat_col, lon_col, popup_columns, zoom_start=12):
-    m = folium.Map(location=[gdf[lat_col].mean(), gdf[lon_col].mean()], zoom_start=zoom_start)
-    for _, row in gdf.iterrows():
-        popup_info = "<br>".join([f"<b>{col}:</b> {row.get(col, 'N/A')}" for col in popup_columns])
-        folium.Marker(
-            location=[row[lat_col], row[lon_col]],
-            popup=popup_info,
-            icon=folium.Icon(color="green", icon="plus-sign")
-        ).add_to(m)
-    return m
+    return map_layers.marker_map(gdf, lat_col, lon_col, popup_columns, zoom_start=zoom_start,
+                                 color="green", icon="plus-sign")
 
 
+main_points = None
+
 # Sidebar: Upload main dataset
 st.sidebar.title("Upload Main Data")
 uploaded_main = st.sidebar.file_uploader(
@@ -99,33 +109,98 @@ uploaded_main = st.sidebar.file_uploader(
     type=['csv','xlsx','xls','shp','zip'], key='main')
 
 if uploaded_main:
-    df_main = load_data(uploaded_main)
-    if df_main is not None:
+    with stage("ingest_main"):
+        main = load_data(uploaded_main)
+    if main is not None:
         st.sidebar.success("✅ Main data loaded!")
         st.subheader("📍 Main Dataset: Coordinate Selection")
-        cols = [''] + list(df_main.columns)
+        cols = [''] + list(main.df.columns)
         c1, c2 = st.columns(2)
         with c1:
             lat_main = st.selectbox("Latitude Column", options=cols, key='lat_main')
         with c2:
             lon_main = st.selectbox("Longitude Column", options=cols, key='lon_main')
         if lat_main and lon_main:
-            df = df_main.dropna(subset=[lat_main, lon_main])
-            df[lat_main] = pd.to_numeric(df[lat_main], errors='coerce')
-            df[lon_main] = pd.to_numeric(df[lon_main], errors='coerce')
-            df = df.dropna(subset=[lat_main, lon_main])
+            data = coordinate_rows(main, lat_main, lon_main)
+            main_points = data.df
+            # Nearest-POI columns from the join section below, once computed
+            join = st.session_state.get("poi_join")
+            if join and join["key"] == poi_join_key(main, lat_main, lon_main, *current_poi_key()):
+                data = data.derive(data.df.join(join["columns"]), 'poi_join', join["source"])
+            df = data.df
             st.subheader("📝 Main Popup Columns")
             popup_main = st.multiselect("Select popup columns", options=df.columns, key='popup_main')
-            # Chunk handling
-            chunk_size=1000; total=df.shape[0]; chunks=(total//chunk_size)+(1 if total%chunk_size else 0)
-            if chunks>1:
-                idx = st.slider("Main chunk",1,chunks, key='chunk_main')
-                df = df.iloc[(idx-1)*chunk_size:idx*chunk_size]
+            render_main = st.radio("Marker rendering", ["Clustered (all points)", "Viewport (visible points)",
+                                                        "Individual markers (chunked)"],
+                                   horizontal=True, key='render_main')
+            main_map = None
+            if render_main == "Viewport (visible points)":
+                with stage("tile_index", cached=True):
+                    tiles = build_tile_index(data, lat_main, lon_main)
+                # st_folium stores the last bounds/zoom under its key; a new
+                # dataset gets a new key so it starts from its own extent
+                view_key = f"viewport_main_{data.fingerprint}"
+                initial = tiles.initial_view(1200, 700)
+                view = folium_view(st.session_state.get(view_key)) or initial
+                with stage("viewport_query"):
+                    rows, in_tiles = tiles.query(*view["bounds"], view["zoom"])
+                    layer = map_layers.point_layer(df.iloc[rows], lat_main, lon_main, popup_main)
+                st.subheader("📍 Main Map")
+                st.caption(f"Showing {len(rows):,} points in view (of {in_tiles:,} nearby, "
+                           f"{tiles.n_points:,} total); zoom in for more detail.")
+                with stage("render_main_map"):
+                    st_folium(create_base_map(*initial["center"], initial["zoom"]), key=view_key,
+                              center=view["center"], zoom=view["zoom"], feature_group_to_add=layer,
+                              width=1200, height=700, returned_objects=["bounds", "zoom", "center"])
+            elif render_main == "Clustered (all points)":
+                with stage("cluster_map", cached=True):
+                    main_map = create_cluster_map(data, lat_main, lon_main, popup_main, color="blue")
+            else:
+                # Chunk handling
+                chunk_size=1000; total=df.shape[0]; chunks=(total//chunk_size)+(1 if total%chunk_size else 0)
+                if chunks>1:
+                    idx = st.slider("Main chunk",1,chunks, key='chunk_main')
+                    data = data.derive(df.iloc[(idx-1)*chunk_size:idx*chunk_size], 'chunk', idx, chunk_size)
+                    df = data.df
+                with stage("create_map", cached=True):
+                    main_map = create_map(data, lat_main, lon_main, popup_main)
             # Display
-            st.subheader("📍 Main Map")
-            st_folium(create_map(df, lat_main, lon_main, popup_main), width=1200)
+            if main_map is not None:
+                st.subheader("📍 Main Map")
+                with stage("render_main_map"):
+                    st_folium(main_map, width=1200)
             st.subheader("🔥 Main Heatmap")
-            st_folium(create_heatmap(df, lat_main, lon_main), width=1200)
+            heat_source = st.radio("Heatmap source", ["Aggregated cells", "Raw points"],
+                                   horizontal=True, key='heat_main')
+            if heat_source == "Aggregated cells":
+                with stage("pyramid_build", cached=True):
+                    pyramid = build_pyramid(data, lat_main, lon_main)
+                # Only cells in the heatmap's current viewport are sent, and the
+                # level stays within one step of the map's zoom, so the payload
+                # is bounded by the screen rather than by the row count
+                heat_key = f"heatmap_main_{data.fingerprint}"
+                view = folium_view(st.session_state.get(heat_key))
+                if view is None and pyramid.bounds is not None:
+                    fit = pyramid.fit_zoom(1200, 700)
+                    center = zoom_center(pyramid)
+                    view = {"center": center, "zoom": fit, "bounds": view_bounds(center, fit, 1200, 700)}
+                view_zoom = view["zoom"] if view else pyramid.min_zoom
+                max_level = min(pyramid.max_zoom, max(view_zoom + 1, pyramid.min_zoom + 1))
+                level = st.session_state.get('zoom_main')
+                if level is None or level > max_level:
+                    st.session_state.zoom_main = min(max(view_zoom, pyramid.min_zoom), max_level)
+                zoom = st.slider("Aggregation zoom level", pyramid.min_zoom, max_level, key='zoom_main')
+                show_cells = st.checkbox("Show density cells (choropleth)", key='cells_main')
+                with stage("aggregated_heatmap"):
+                    heat_map = create_aggregated_heatmap(pyramid, zoom, show_cells, view)
+                with stage("render_heatmap"):
+                    st_folium(heat_map, width=1200, height=700, key=heat_key,
+                              returned_objects=["bounds", "zoom", "center"])
+            else:
+                with stage("create_heatmap", cached=True):
+                    heat_map = create_heatmap(data, lat_main, lon_main)
+                with stage("render_heatmap"):
+                    st_folium(heat_map, width=1200)
 
 # Sidebar: Upload POI dataset
 st.sidebar.title("Upload POI Data")
@@ -134,25 +209,66 @@ uploaded_poi = st.sidebar.file_uploader(
     type=['csv','xlsx','xls','shp','zip'], key='poi')
 
 if uploaded_poi:
-    df_poi = load_data(uploaded_poi)
-    if df_poi is not None:
+    with stage("ingest_poi"):
+        poi_data = load_data(uploaded_poi)
+    if poi_data is not None:
         st.sidebar.success("✅ POI data loaded!")
         st.subheader("📍 POI Dataset: Coordinate Selection")
-        cols_p = [''] + list(df_poi.columns)
+        cols_p = [''] + list(poi_data.df.columns)
         p1, p2 = st.columns(2)
         with p1:
             lat_poi = st.selectbox("POI Latitude Column", options=cols_p, key='lat_poi')
         with p2:
             lon_poi = st.selectbox("POI Longitude Column", options=cols_p, key='lon_poi')
         if lat_poi and lon_poi:
-            poi = df_poi.dropna(subset=[lat_poi, lon_poi])
-            poi[lat_poi] = pd.to_numeric(poi[lat_poi], errors='coerce')
-            poi[lon_poi] = pd.to_numeric(poi[lon_poi], errors='coerce')
-            poi = poi.dropna(subset=[lat_poi, lon_poi])
+            poi_points = coordinate_rows(poi_data, lat_poi, lon_poi)
+            poi = poi_points.df
             st.subheader("📝 POI Popup Columns")
             popup_poi = st.multiselect("Select POI popup columns", options=poi.columns, key='popup_poi')
+            render_poi = st.radio("POI marker rendering", ["Clustered (all points)", "Individual markers"],
+                                  horizontal=True, key='render_poi')
             st.subheader("📍 POI Map")
-            st_folium(create_map_from_gdf(poi, lat_poi, lon_poi, popup_poi), width=1200)
+            if render_poi == "Clustered (all points)":
+                with stage("poi_cluster_map", cached=True):
+                    poi_map = create_cluster_map(poi_points, lat_poi, lon_poi, popup_poi, color="green")
+            else:
+                with stage("poi_map"):
+                    poi_map = create_map_from_gdf(poi, lat_poi, lon_poi, popup_poi)
+            with stage("render_poi_map"):
+                st_folium(poi_map, width=1200)
+
+            # Nearest-POI join against the main dataset
+            if main_points is not None:
+                st.subheader("📏 Nearest POI Join")
+                j1, j2 = st.columns(2)
+                with j1:
+                    label_poi = st.selectbox("POI name column", options=['(row number)'] + list(poi.columns),
+                                             key='label_poi')
+                with j2:
+                    radius_m = st.number_input("Count POIs within (metres)", min_value=10, value=500,
+                                               step=50, key='radius_poi')
+                join_key = poi_join_key(main, lat_main, lon_main, poi_data.fingerprint, lat_poi, lon_poi)
+                if st.button("Compute nearest POI"):
+                    with stage("poi_index", cached=True):
+                        index = build_poi_index(poi_points, lat_poi, lon_poi,
+                                                None if label_poi == '(row number)' else label_poi)
+                    with stage("poi_join"):
+                        joined = index.join(main_points[lat_main], main_points[lon_main],
+                                            radius_m=radius_m, index=main_points.index)
+                    # ``source`` identifies the join's inputs for derived fingerprints
+                    st.session_state.poi_join = {"key": join_key, "columns": joined,
+                                                 "source": (poi_points.fingerprint, label_poi, radius_m)}
+                    # Rerun so the main map picks the new columns up as popup options
+                    st.rerun()
+                join = st.session_state.get("poi_join")
+                if join and join["key"] == join_key:
+                    st.dataframe(main_points.head(100).join(join["columns"]), use_container_width=True)
+                    # Joined and serialized only when the button is clicked
+                    st.download_button("⬇️ Download joined dataset",
+                                       lambda: main_points.join(join["columns"]).to_csv(index=False),
+                                       file_name="main_with_nearest_poi.csv", mime="text/csv")
 else:
     if not uploaded_main:
         st.info("Upload a dataset to visualize geospatial data.")
+
+render_panel()
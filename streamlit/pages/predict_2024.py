@@ -2,107 +2,98 @@
 
 import streamlit as st
 import pandas as pd
-import joblib
-
-REQUIRED_COLUMNS = [
-    'Gender', 'One_Way_Permit_Application_Category',
-    'Social_Welfare_Department', 'Receive_Communications',
-    'Knows_Cantonese', 'Education',
-    'Had_Long_Term_Work_in_Mainland_Before_Arrival', 'Occupation',
-    'Settlement_Father', 'Settlement_Mother',
-    'Number_of_Biological_Children', 'age', 'Year', 'Month', 'Day',
-    'address_latitude', 'address_longitude', 'origin_address_latitude',
-    'origin_address_longitude'
-]
-
-@st.cache_resource
-def load_model(name):
-    return joblib.load(f"streamlit/mmodels/{name.lower()}_2024.pkl")
-
-@st.cache_data
-def process_input(df, drop_column=None):
-    if drop_column and drop_column in df.columns:
-        df = df.drop(columns=[drop_column])
-    
-    numeric_df = df.select_dtypes(exclude='object')
-    object_df = df.select_dtypes(include='object')
-    
-    # Convert all object columns to strings, then get dummies
-    if not object_df.empty:
-        object_df = object_df.astype(str)
-        dummy_df = pd.get_dummies(object_df)
-        processed_df = pd.concat([numeric_df, dummy_df], axis=1)
-    else:
-        processed_df = numeric_df
-    
-    return processed_df
+import math
+import os
+from model_families import MODEL_NAMES, available_models, model_path, numeric_columns, required_columns
+from model_registry import get_model, preload_models
+from ingest import cached_table_path, memory_report, read_upload
+from prediction_cache import get_prediction_job
+from batch import (PredictionWriter, file_download, iter_chunks, iter_frame_chunks, read_page,
+                   remove_stale_outputs, score_chunks)
+from instrument import begin_run, mark_cache, render_panel, stage
+from scoring_service import SERVICE_URL, RemoteEncoder, RemoteModel, ScoringClient
+
+FAMILY = "2024"
+REQUIRED_COLUMNS = required_columns(FAMILY)
+NUMERIC_COLUMNS = numeric_columns(FAMILY)
 
 # Streamlit UI Setup
 st.set_page_config("Predictive Modeling Interface", layout="wide")
 st.title("🔍 Predictive Modeling Interface")
+begin_run("predict_2024")
+
+# No-op if app.py already started it; covers landing on this page directly
+preload_models([model_path(family, name) for family, name in available_models()])
 
 st.sidebar.header("Prediction Settings")
 input_type = st.sidebar.radio("Select Input Type", ("Upload File", "Manual Input"))
-model_choice = st.sidebar.selectbox("Model", ["RandomForest", "XGBoost"])
+model_choice = st.sidebar.selectbox("Model", MODEL_NAMES)
+# With FYP_SCORING_URL set, models live in the shared scoring service
+use_service = bool(SERVICE_URL) and st.sidebar.checkbox("Score on shared service", value=True)
 
 input_df = None
 drop_col = None
+uploaded_file = None
 
 # Upload Section
 if input_type == "Upload File":
     uploaded_file = st.sidebar.file_uploader("Upload File (CSV or XLSX)", type=["csv", "xlsx"])
     if uploaded_file:
         try:
-            if uploaded_file.name.endswith('.csv'):
-                df = pd.read_csv(uploaded_file)
-            else:
-                df = pd.read_excel(uploaded_file)
+            # Shared ingestion cache: parsed once per upload across all pages
+            with stage("ingest"):
+                df, fingerprint = read_upload(uploaded_file)
             st.session_state.df = df
+            st.session_state.df_fingerprint = fingerprint
         except Exception as e:
             st.error(f"Failed to read file: {e}")
     
     if 'df' in st.session_state:
         df = st.session_state.df
         st.write("📄 Uploaded Data Preview", df.head())
+        report = memory_report(st.session_state.get("df_fingerprint"))
+        if report:
+            st.caption(f"🧮 In memory: {report['after_mb']:.1f} MB (was {report['before_mb']:.1f} MB before dtype compaction)")
 
         drop_col = st.selectbox("Which column is the service label?", ["None"] + list(df.columns))
         drop_col = None if drop_col == "None" else drop_col
-        input_df = df.copy()
-        input_df = process_input(input_df, drop_column=drop_col)
+        input_df = df
 
 # Manual Input Section
 else:
     st.subheader("Manual Input")
     manual_data = {}
     for col in REQUIRED_COLUMNS:
-        if col in ['Number_of_Biological_Children', 'age', 'Year', 'Month', 'Day',
-                   'address_latitude', 'address_longitude',
-                   'origin_address_latitude', 'origin_address_longitude']:
+        if col in NUMERIC_COLUMNS:
             manual_data[col] = st.number_input(col, value=0.0)
         else:
             manual_data[col] = st.text_input(col, "")
 
     input_df = pd.DataFrame([manual_data])
-    input_df = process_input(input_df)
 
 # Prediction Controls
 if input_df is not None and not input_df.empty:
     st.markdown("## 🔮 Prediction Options")
     prediction_mode = st.radio("Choose prediction mode:", ("Predict All", "Step-by-Step"))
-    model = load_model(model_choice)
+    if use_service:
+        # Thin client: rows go to the service, which encodes and micro-batches them
+        client = ScoringClient()
+        model, encoder = RemoteModel(client, FAMILY, model_choice), RemoteEncoder()
+        model_id = (client.url, FAMILY, model_choice)
+        with st.sidebar.expander("Scoring service"):
+            st.json(client.health() or {"status": f"unreachable at {client.url}"})
+    else:
+        # Shared per-process registry: reloads only if the .pkl changes on disk
+        with stage("model_load"):
+            entry = get_model(model_path(FAMILY, model_choice))
+        model = entry.model
+        model_id = (entry.path, entry.mtime)
+        with st.sidebar.expander("Model info"):
+            st.json(entry.stats())
 
     try:
-        # Align with model features
-        model_features = (
-            model.feature_names_in_
-            if hasattr(model, "feature_names_in_")
-            else model.get_booster().feature_names
-        )
-
-        missing_cols = [col for col in model_features if col not in input_df.columns]
-        for col in missing_cols:
-            input_df[col] = 0
-        input_df = input_df[model_features]
+        if not use_service:
+            encoder = entry.encoder_for(REQUIRED_COLUMNS)
 
         if prediction_mode == "Step-by-Step":
             if "row_index" not in st.session_state:
@@ -111,11 +102,34 @@ if input_df is not None and not input_df.empty:
             total_rows = len(input_df)
             current_index = st.session_state.row_index
 
+            # Score the whole upload once in the background; steps become lookups
+            job = None
+            fingerprint = st.session_state.get("df_fingerprint") if input_type == "Upload File" else None
+            if fingerprint is not None:
+                job_key = (fingerprint, *model_id, drop_col)
+                job = get_prediction_job(st.session_state, job_key, input_df, model, encoder, drop_col)
+                if job.error is not None:
+                    st.warning(f"Background scoring failed: {job.error}")
+                elif not job.done.is_set():
+                    st.caption(f"⏳ Precomputing predictions: {job.scored:,} of {job.total:,} rows")
+
             if current_index < total_rows:
                 st.write(f"🔢 Predicting row {current_index + 1} of {total_rows}")
                 if st.button("Predict This One"):
-                    prediction = model.predict(input_df.iloc[[current_index]])
-                    st.success(f"🎯 Predicted: {prediction[0]}")
+                    with stage("predict_row"):
+                        cached = job.lookup(current_index) if job is not None else None
+                        mark_cache(cached is not None)
+                        if cached is not None:
+                            prediction, proba = cached
+                        else:
+                            # Not precomputed yet: encode just this row
+                            features = encoder.transform_frame(input_df.iloc[[current_index]],
+                                                               drop_column=drop_col)
+                            prediction = model.predict(features)[0]
+                            proba = None
+                    st.success(f"🎯 Predicted: {prediction}")
+                    if proba:
+                        st.write("Class probabilities", pd.Series(proba, name="probability"))
                 if st.button("Next One"):
                     st.session_state.row_index += 1
                     st.rerun()
@@ -123,12 +137,57 @@ if input_df is not None and not input_df.empty:
                 st.info("✅ All rows have been predicted.")
 
         else:  # Predict All
+            b1, b2 = st.columns(2)
+            with b1:
+                chunk_size = int(st.number_input("Rows per batch", min_value=1000,
+                                                 max_value=1_000_000, value=50_000, step=10_000))
+            with b2:
+                out_fmt = st.selectbox("Output format", ["csv", "parquet"])
+
+            # A stored result only belongs to the inputs that produced it
+            batch_key = (st.session_state.get("df_fingerprint") if uploaded_file else None,
+                         *model_id, drop_col, out_fmt)
+            previous = st.session_state.get("batch_result")
+            if previous and previous["key"] != batch_key:
+                st.session_state.pop("batch_result")
+                if os.path.exists(previous["path"]):
+                    os.remove(previous["path"])
+
             if st.button("Predict All Rows"):
-                predictions = model.predict(input_df)
-                results = input_df.copy()
-                results["Predicted_Service_Type"] = predictions
-                st.dataframe(results)
+                # Stream the upload through encode -> predict -> disk in fixed-size chunks
+                cached = cached_table_path(st.session_state.get("df_fingerprint")) if uploaded_file else None
+                if cached is not None:
+                    chunks = iter_chunks(cached, cached, chunk_size)
+                else:
+                    chunks = iter_frame_chunks(input_df, chunk_size)
+                previous = st.session_state.pop("batch_result", None)
+                if previous and os.path.exists(previous["path"]):
+                    os.remove(previous["path"])
+                remove_stale_outputs()
+
+                total = max(len(input_df), 1)
+                progress = st.progress(0.0, text="Scoring...")
+                with stage("predict_all"), PredictionWriter(out_fmt) as writer:
+                    for scored in score_chunks(chunks, model, encoder, drop_column=drop_col):
+                        writer.write(scored)
+                        progress.progress(min(writer.rows / total, 1.0),
+                                          text=f"Scored {writer.rows:,} of {total:,} rows")
+                st.session_state.batch_result = {"key": batch_key, "path": writer.path,
+                                                 "fmt": out_fmt, "rows": writer.rows}
                 st.success("✅ Batch prediction complete!")
 
+            result = st.session_state.get("batch_result")
+            if result and os.path.exists(result["path"]):
+                page_size = 100
+                n_pages = max(math.ceil(result["rows"] / page_size), 1)
+                page = st.number_input(f"Preview page (of {n_pages})", min_value=1, max_value=n_pages, value=1)
+                with stage("preview_page"):
+                    st.dataframe(read_page(result["path"], result["fmt"], page - 1, page_size))
+                # Read from disk only when clicked, not on every rerun
+                st.download_button("⬇️ Download predictions", file_download(result["path"]),
+                                   file_name=f"predictions.{result['fmt']}")
+
     except Exception as e:
         st.error(f"Prediction error: {e}")
+
+render_panel()
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import BallTree
+
+EARTH_RADIUS_M = 6_371_008.8
+
+
+class PoiIndex:
+    """
+    Haversine ball tree over POI coordinates, built once per POI upload.
+
+    Replaces the O(N x M) distance loops: each query point costs roughly
+    O(log M), and queries run in fixed-size vectorized batches.
+    """
+
+    def __init__(self, lat, lon, labels=None):
+        """
+        :param lat: array-like of POI latitudes
+        :param lon: array-like of POI longitudes
+        :param labels: array-like, optional POI name per point (defaults to row position)
+        """
+        coords = np.radians(np.column_stack([np.asarray(lat, dtype=float), np.asarray(lon, dtype=float)]))
+        self.tree = BallTree(coords, metric="haversine")
+        self.labels = np.arange(len(coords)) if labels is None else np.asarray(labels)
+
+    def join(self, lat, lon, radius_m=500, batch_size=100_000, index=None):
+        """
+        Nearest POI, its distance and the POI count within ``radius_m`` for each point
+
+        :param lat: array-like of query latitudes
+        :param lon: array-like of query longitudes
+        :param radius_m: float, radius for the POI count in metres
+        :param index: optional index for the returned frame (e.g. the main df's)
+        :return: pandas.DataFrame with nearest_poi, nearest_poi_distance_m and
+                 pois_within_<radius>m columns
+        """
+        coords = np.radians(np.column_stack([np.asarray(lat, dtype=float), np.asarray(lon, dtype=float)]))
+        n = len(coords)
+        nearest = np.empty(n, dtype=np.intp)
+        distance = np.empty(n)
+        within = np.empty(n, dtype=np.int64)
+        radius = radius_m / EARTH_RADIUS_M
+        for start in range(0, n, batch_size):
+            batch = coords[start:start + batch_size]
+            dist, idx = self.tree.query(batch, k=1)
+            nearest[start:start + len(batch)] = idx[:, 0]
+            distance[start:start + len(batch)] = dist[:, 0] * EARTH_RADIUS_M
+            within[start:start + len(batch)] = self.tree.query_radius(batch, r=radius, count_only=True)
+        return pd.DataFrame({
+            "nearest_poi": self.labels[nearest],
+            "nearest_poi_distance_m": distance.round(1),
+            f"pois_within_{radius_m:g}m": within,
+        }, index=index)
@@ -0,0 +1,80 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from model_registry import predict_with_proba
+
+
+class PredictionJob:
+    """
+    Scores a whole encoded upload once in a background thread
+
+    Once ``done`` is set, ``predictions`` and ``probabilities`` hold one entry
+    per input row, so stepping through rows is a plain array lookup.
+    """
+
+    def __init__(self, df, model, encoder, drop_column=None, chunksize=50_000):
+        self.total = len(df)
+        self.scored = 0
+        self.predictions = None
+        self.probabilities = None
+        self.classes = getattr(model, "classes_", None)
+        self.error = None
+        self.done = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, args=(df, model, encoder, drop_column, chunksize), daemon=True)
+        self._thread.start()
+
+    def _run(self, df, model, encoder, drop_column, chunksize):
+        try:
+            preds, probas = [], []
+            for start in range(0, self.total, chunksize):
+                features = encoder.transform_frame(df.iloc[start:start + chunksize], drop_column=drop_column)
+                predictions, proba = predict_with_proba(model, features)
+                preds.append(predictions)
+                if proba is not None:
+                    probas.append(proba)
+                self.scored = min(start + chunksize, self.total)
+            self.predictions = np.concatenate(preds) if preds else np.empty(0)
+            if probas:
+                self.probabilities = np.vstack(probas)
+            # Read after scoring: remote models only learn their classes then
+            self.classes = getattr(model, "classes_", None)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done.set()
+
+    def lookup(self, index):
+        """
+        Return (prediction, {class: probability}) for one row, or None if the
+        job has not finished yet
+        """
+        if not self.done.is_set() or self.error is not None:
+            return None
+        proba = None
+        if self.probabilities is not None:
+            labels = self.classes if self.classes is not None else range(self.probabilities.shape[1])
+            proba = dict(zip(labels, self.probabilities[index]))
+        return self.predictions[index], proba
+
+
+def get_prediction_job(store, key, df, model, encoder, drop_column=None, max_jobs=4):
+    """
+    Fetch or start the PredictionJob for ``key`` in a per-session store
+
+    :param store: dict-like kept in ``st.session_state``
+    :param key: hashable, e.g. (upload fingerprint, model path, mtime, drop column)
+    :param max_jobs: int, older jobs are dropped beyond this many
+    """
+    jobs = store.setdefault("prediction_jobs", OrderedDict())
+    job = jobs.get(key)
+    if job is None:
+        job = PredictionJob(df, model, encoder, drop_column=drop_column)
+        jobs[key] = job
+        while len(jobs) > max_jobs:
+            jobs.popitem(last=False)
+    else:
+        jobs.move_to_end(key)
+    return job
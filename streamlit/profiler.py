@@ -0,0 +1,159 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Above this many rows a column is profiled with sketches instead of exactly
+EXACT_ROW_LIMIT = 2_000_000
+SAMPLE_SIZE = 200_000
+HIST_BINS = 50
+MAX_VALUE_COUNTS = 50
+
+
+def _leading_zeros(x):
+    """Leading zero count of each uint64 in ``x``, by binary search on the bits"""
+    n = np.zeros(len(x), dtype=np.int64)
+    x = x.copy()
+    for shift in (32, 16, 8, 4, 2, 1):
+        # Top ``shift`` bits all zero: count them and shift them out
+        empty = x < np.uint64(1 << (64 - shift))
+        n[empty] += shift
+        x[empty] <<= np.uint64(shift)
+    n[x == 0] = 64
+    return n
+
+
+def hll_distinct(values, p=14):
+    """
+    HyperLogLog estimate of the number of distinct non-null values
+
+    :param values: array-like
+    :param p: int, register bits (2**p registers, ~1.04/sqrt(2**p) error)
+    """
+    values = pd.Series(values).dropna()
+    if values.empty:
+        return 0
+    h = pd.util.hash_array(values.to_numpy()).astype(np.uint64)
+    m = 1 << p
+    idx = (h >> np.uint64(64 - p)).astype(np.int64)
+    rest = (h << np.uint64(p)) & np.uint64(0xFFFFFFFFFFFFFFFF)
+    rank = np.minimum(_leading_zeros(rest), 64 - p) + 1
+    registers = np.zeros(m, dtype=np.int64)
+    np.maximum.at(registers, idx, rank)
+
+    alpha = 0.7213 / (1 + 1.079 / m)
+    estimate = alpha * m * m / np.sum(2.0 ** -registers)
+    zeros = np.count_nonzero(registers == 0)
+    if estimate <= 2.5 * m and zeros:
+        estimate = m * np.log(m / zeros)
+    return int(round(estimate))
+
+
+def _histogram(values):
+    values = values[np.isfinite(values)]
+    if len(values) == 0:
+        return None
+    counts, edges = np.histogram(values, bins=HIST_BINS)
+    return {"counts": counts, "edges": edges}
+
+
+def profile_frame(df, exact_row_limit=EXACT_ROW_LIMIT, seed=0):
+    """
+    Profile every column of a DataFrame in one pass per column
+
+    Null counts come from one ``isna`` over the whole frame, and the numeric
+    statistics from NumPy reductions over each column, instead of a
+    ``describe`` call per column. Past ``exact_row_limit`` rows, distinct
+    counts of numeric columns use HyperLogLog and quantiles a seeded uniform
+    sample; histograms are always binned over the full column, so their
+    counts are real counts.
+
+    :return: dict mapping column name to a stats dict (see ``describe``)
+    """
+    n_rows = len(df)
+    approximate = n_rows > exact_row_limit
+    null_counts = df.isna().sum()
+    profile = {}
+
+    numeric_cols = [c for c in df.columns
+                    if pd.api.types.is_numeric_dtype(df[c]) and not pd.api.types.is_bool_dtype(df[c])]
+    # Rows for the quantile sample, drawn once and shared by every column
+    rows = (np.sort(np.random.default_rng(seed).choice(n_rows, min(SAMPLE_SIZE, n_rows), replace=False))
+            if approximate else None)
+    # One column at a time, so only one float64 copy is alive however many
+    # compacted numeric columns the upload has
+    for col in numeric_cols:
+        values = df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+        sample = values[rows] if approximate else values
+        with np.errstate(all="ignore"):
+            quantiles = np.nanquantile(sample, [0.25, 0.5, 0.75])
+            profile[col] = {
+                "kind": "numeric",
+                "mean": np.nanmean(values), "std": np.nanstd(values, ddof=1), "min": np.nanmin(values),
+                "25%": quantiles[0], "50%": quantiles[1], "75%": quantiles[2],
+                "max": np.nanmax(values),
+                "histogram": _histogram(values),
+            }
+
+    for col in df.columns:
+        s = df[col]
+        stats = profile.setdefault(col, {"kind": "categorical"})
+        stats["dtype"] = str(s.dtype)
+        stats["count"] = n_rows
+        stats["non_null"] = int(n_rows - null_counts[col])
+        stats["nulls"] = int(null_counts[col])
+        if stats["kind"] == "categorical":
+            # Value counts are needed for the top value anyway; they give the
+            # exact distinct count for free
+            counts = s.value_counts()
+            stats["unique"] = len(counts)
+            stats["unique_is_estimate"] = False
+            stats["value_counts"] = counts.head(MAX_VALUE_COUNTS)
+            if len(counts):
+                stats["top"] = counts.index[0]
+                stats["freq"] = int(counts.iloc[0])
+            continue
+        if approximate:
+            stats["unique"] = hll_distinct(s)
+            stats["unique_is_estimate"] = True
+        else:
+            stats["unique"] = int(s.nunique())
+            stats["unique_is_estimate"] = False
+        if stats["unique"] <= MAX_VALUE_COUNTS:
+            stats["value_counts"] = s.value_counts().head(MAX_VALUE_COUNTS)
+    return profile
+
+
+def describe(stats):
+    """The profile of one column laid out like ``Series.describe(include='all')``"""
+    if stats["kind"] == "numeric":
+        keys = ["mean", "std", "min", "25%", "50%", "75%", "max"]
+        return pd.Series({"count": stats["non_null"], **{k: stats[k] for k in keys}})
+    return pd.Series({"count": stats["non_null"], "unique": stats["unique"],
+                      "top": stats.get("top"), "freq": stats.get("freq")})
+
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="profiler")
+_profiles = OrderedDict()
+_profiles_max = 8
+_lock = threading.Lock()
+
+
+def start_profile(fingerprint, df):
+    """
+    Profile a dataset in a background thread, once per fingerprint
+
+    :return: concurrent.futures.Future resolving to the ``profile_frame`` dict
+    """
+    with _lock:
+        future = _profiles.get(fingerprint)
+        if future is None:
+            future = _executor.submit(profile_frame, df)
+            _profiles[fingerprint] = future
+            while len(_profiles) > _profiles_max:
+                _profiles.popitem(last=False)
+        else:
+            _profiles.move_to_end(fingerprint)
+        return future
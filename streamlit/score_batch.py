@@ -0,0 +1,136 @@
+"""
+Headless batch scoring with the same pipeline as the predict pages.
+
+Run from the repository root, e.g.::
+
+    python streamlit/score_batch.py monthly.csv -o predictions.csv \\
+        --family 2024 --model XGBoost --workers 8
+
+The input is read in chunks, each chunk is encoded and scored in a worker
+process, and the results are written back in input order.
+"""
+import argparse
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from batch import PREDICTION_COLUMN, PredictionWriter, iter_chunks
+from model_families import MODEL_FAMILIES, MODEL_NAMES, model_path, required_columns
+from model_registry import get_model
+
+# Per-worker state, set once by _init_worker
+_model = None
+_encoder = None
+
+
+def _init_worker(family, name):
+    global _model, _encoder
+    # Forked workers find the parent's entry in the registry and share its
+    # pages copy-on-write; other start methods load their own copy here
+    entry = get_model(model_path(family, name))
+    _model = entry.model
+    _encoder = entry.encoder_for(required_columns(family))
+
+
+def _score_shard(chunk, drop_column):
+    t0 = time.perf_counter()
+    features = _encoder.transform_frame(chunk, drop_column=drop_column)
+    t1 = time.perf_counter()
+    predictions = _model.predict(features)
+    t2 = time.perf_counter()
+    return predictions, t1 - t0, t2 - t1
+
+
+class StageTimer:
+    """Accumulates seconds and rows per pipeline stage"""
+
+    def __init__(self):
+        self.seconds = {}
+        self.rows = {}
+
+    def add(self, stage, seconds, rows):
+        self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+        self.rows[stage] = self.rows.get(stage, 0) + rows
+
+    def report(self):
+        lines = []
+        for stage, secs in self.seconds.items():
+            rate = self.rows[stage] / secs if secs else float("inf")
+            lines.append(f"  {stage:<8} {secs:9.2f}s  {rate:14,.0f} rows/s")
+        return "\n".join(lines)
+
+
+def score_file(path, output, family, name, workers=None, chunksize=50_000,
+               drop_column=None, fmt=None):
+    """
+    Score a CSV/XLSX file across a process pool and write ordered results
+
+    :return: (rows scored, StageTimer, wall seconds)
+    """
+    workers = workers or os.cpu_count() or 1
+    fmt = fmt or ("parquet" if output.endswith(".parquet") else "csv")
+    timer = StageTimer()
+    start = time.perf_counter()
+    # Load once in the parent so forked workers inherit the model rather than
+    # each unpickling a private copy
+    get_model(model_path(family, name))
+    context = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() else None
+
+    with open(path, "rb") as source, \
+            ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker,
+                                initargs=(family, name)) as pool, \
+            PredictionWriter(fmt, path=output) as writer:
+        chunks = iter_chunks(source, path, chunksize)
+        # Keep a bounded number of shards in flight so memory does not grow
+        # with the input; popping from the left preserves input order
+        pending = deque()
+
+        def drain_one():
+            chunk, future = pending.popleft()
+            predictions, enc_s, pred_s = future.result()
+            timer.add("encode", enc_s, len(chunk))
+            timer.add("predict", pred_s, len(chunk))
+            t0 = time.perf_counter()
+            chunk[PREDICTION_COLUMN] = predictions
+            writer.write(chunk)
+            timer.add("write", time.perf_counter() - t0, len(chunk))
+
+        while True:
+            t0 = time.perf_counter()
+            chunk = next(chunks, None)
+            if chunk is None:
+                break
+            timer.add("read", time.perf_counter() - t0, len(chunk))
+            pending.append((chunk, pool.submit(_score_shard, chunk, drop_column)))
+            if len(pending) >= 2 * workers:
+                drain_one()
+        while pending:
+            drain_one()
+
+    return writer.rows, timer, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch-score a CSV/XLSX file with a trained model.")
+    parser.add_argument("input", help="CSV or XLSX file to score")
+    parser.add_argument("-o", "--output", required=True, help="output .csv or .parquet file")
+    parser.add_argument("--family", choices=sorted(MODEL_FAMILIES), default="base",
+                        help="model family: 'base' (predict page) or '2024' (predict_2024 page)")
+    parser.add_argument("--model", choices=MODEL_NAMES, default="RandomForest")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--chunksize", type=int, default=50_000, help="rows per shard")
+    parser.add_argument("--drop-column", default=None, help="service label column to ignore")
+    args = parser.parse_args(argv)
+
+    rows, timer, wall = score_file(args.input, args.output, args.family, args.model,
+                                   workers=args.workers, chunksize=args.chunksize,
+                                   drop_column=args.drop_column)
+    print(f"Scored {rows:,} rows in {wall:.2f}s ({rows / wall if wall else 0:,.0f} rows/s overall)")
+    print("Per stage (encode/predict are summed over workers):")
+    print(timer.report())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,386 @@
+"""
+Local scoring service shared by every Streamlit session.
+
+Run from the repository root, e.g.::
+
+    python streamlit/scoring_service.py --port 8765 --workers 8
+
+then start Streamlit with ``FYP_SCORING_URL=http://127.0.0.1:8765`` and the
+predict pages send their rows here instead of loading models themselves.
+
+The service loads each model once (see model_registry.py). Requests are
+encoded in their own handler threads, then coalesced into micro-batches:
+a batch worker takes the first queued request, waits up to ``max_wait_ms``
+for more, and scores them with one ``predict_proba`` call. Tree inference
+releases the GIL, so several batch workers keep all cores busy while model
+memory stays the same however many sessions are connected.
+
+Requests are ``POST /predict?family=base&model=RandomForest[&drop_column=X]``
+with the rows as an Arrow IPC stream; the reply is JSON with ``classes``,
+``predictions`` and ``probabilities``. ``GET /health`` reports loaded models
+and batching counters.
+"""
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from model_families import MODEL_FAMILIES, MODEL_NAMES, model_path, required_columns
+from model_registry import get_model, predict_with_proba, registry_stats
+
+# Set this in the Streamlit environment to make the predict pages use the service
+SERVICE_URL = os.environ.get("FYP_SCORING_URL")
+
+
+class BatcherClosed(RuntimeError):
+    """Raised by MicroBatcher.submit once the batcher is closed (model reloaded)"""
+
+
+class _Pending:
+    __slots__ = ("features", "done", "result", "error")
+
+    def __init__(self, features):
+        self.features = features
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent scoring requests for one model into larger batches
+
+    :param model: fitted estimator
+    :param workers: int, batch worker threads
+    :param max_batch_rows: int, stop collecting requests past this many rows
+    :param max_wait_ms: float, how long the first request waits for company
+    :param submit_timeout: float, seconds a request waits for its result
+    """
+
+    def __init__(self, model, workers=None, max_batch_rows=8192, max_wait_ms=5.0, submit_timeout=120.0):
+        self.model = model
+        self.max_batch_rows = max_batch_rows
+        self.max_wait = max_wait_ms / 1000
+        self.submit_timeout = submit_timeout
+        self.batches = 0
+        self.requests = 0
+        self.rows = 0
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        # Orders submits against close(), so nothing is queued behind the
+        # shutdown sentinels where no worker would ever pick it up
+        self._close_lock = threading.Lock()
+        self._closed = False
+        self._workers = workers or os.cpu_count() or 1
+        for _ in range(self._workers):
+            threading.Thread(target=self._work, daemon=True).start()
+
+    def close(self):
+        """Stop the batch workers once the queued requests are served"""
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+            for _ in range(self._workers):
+                self._queue.put(None)
+
+    def submit(self, features):
+        """
+        Score an encoded frame; blocks until its batch has run
+
+        :raises BatcherClosed: the batcher was closed; retry on the current one
+        :raises TimeoutError: no result within ``submit_timeout`` seconds
+        """
+        pending = _Pending(features)
+        with self._close_lock:
+            if self._closed:
+                raise BatcherClosed("model was reloaded")
+            self._queue.put(pending)
+        if not pending.done.wait(self.submit_timeout):
+            raise TimeoutError(f"no result within {self.submit_timeout:g}s")
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def _collect(self):
+        first = self._queue.get()
+        if first is None:
+            return None, 0
+        batch = [first]
+        rows = len(batch[0].features)
+        deadline = time.perf_counter() + self.max_wait
+        while rows < self.max_batch_rows:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                # Shutting down: let another worker see the sentinel
+                self._queue.put(None)
+                break
+            batch.append(item)
+            rows += len(item.features)
+        return batch, rows
+
+    def _work(self):
+        import pandas as pd
+
+        while True:
+            batch, rows = self._collect()
+            if batch is None:
+                return
+            try:
+                features = (batch[0].features if len(batch) == 1
+                            else pd.concat([p.features for p in batch], ignore_index=True))
+                predictions, proba = predict_with_proba(self.model, features)
+                start = 0
+                for p in batch:
+                    end = start + len(p.features)
+                    p.result = (predictions[start:end], None if proba is None else proba[start:end])
+                    start = end
+            except Exception as e:
+                for p in batch:
+                    p.error = e
+            with self._stats_lock:
+                self.batches += 1
+                self.requests += len(batch)
+                self.rows += rows
+            for p in batch:
+                p.done.set()
+
+    def stats(self):
+        with self._stats_lock:
+            return {"batches": self.batches, "requests": self.requests, "rows": self.rows,
+                    "mean_batch_rows": self.rows / self.batches if self.batches else None}
+
+
+class ScoringServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, workers=None, max_batch_rows=8192, max_wait_ms=5.0):
+        super().__init__(address, ScoringHandler)
+        self.workers = workers
+        self.max_batch_rows = max_batch_rows
+        self.max_wait_ms = max_wait_ms
+        self._batchers = {}
+        self._lock = threading.Lock()
+
+    def batcher(self, family, name):
+        """(ModelEntry, MicroBatcher) for a model, rebuilt if the .pkl changed"""
+        entry = get_model(model_path(family, name))
+        key = (family, name)
+        with self._lock:
+            current = self._batchers.get(key)
+            if current is None or current[0] is not entry:
+                if current is not None:
+                    current[1].close()
+                current = (entry, MicroBatcher(entry.model, self.workers,
+                                               self.max_batch_rows, self.max_wait_ms))
+                self._batchers[key] = current
+        return current
+
+    def score(self, family, name, rows, drop_column=None):
+        """
+        Encode and score rows with the current batcher for a model
+
+        A request that raced a model reload and reached the retired batcher
+        is resubmitted to the new one.
+
+        :return: (ModelEntry, predictions, probabilities or None)
+        """
+        while True:
+            entry, batcher = self.batcher(family, name)
+            features = entry.encoder_for(required_columns(family)).transform_frame(
+                rows, drop_column=drop_column)
+            try:
+                predictions, proba = batcher.submit(features)
+            except BatcherClosed:
+                continue
+            return entry, predictions, proba
+
+    def stats(self):
+        return {"models": registry_stats(),
+                "batching": {f"{f}/{n}": b.stats() for (f, n), (_, b) in self._batchers.items()}}
+
+
+class ScoringHandler(BaseHTTPRequestHandler):
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/health":
+            self._reply(200, {"status": "ok", **self.server.stats()})
+        else:
+            self._reply(404, {"error": "not found"})
+
+    def do_POST(self):
+        url = urllib.parse.urlparse(self.path)
+        if url.path != "/predict":
+            self._reply(404, {"error": "not found"})
+            return
+        params = dict(urllib.parse.parse_qsl(url.query))
+        family, name = params.get("family", "base"), params.get("model", MODEL_NAMES[0])
+        if family not in MODEL_FAMILIES or name not in MODEL_NAMES:
+            self._reply(400, {"error": f"unknown model {family}/{name}"})
+            return
+        try:
+            import pyarrow as pa
+
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            rows = pa.ipc.open_stream(body).read_pandas()
+            entry, predictions, proba = self.server.score(family, name, rows, params.get("drop_column"))
+        except Exception as e:
+            self._reply(500, {"error": f"{type(e).__name__}: {e}"})
+            return
+        classes = getattr(entry.model, "classes_", None)
+        self._reply(200, {
+            "classes": None if classes is None else np.asarray(classes).tolist(),
+            "predictions": np.asarray(predictions).tolist(),
+            "probabilities": None if proba is None else proba.tolist(),
+        })
+
+    def log_message(self, format, *args):
+        # One line per request is too chatty under load
+        pass
+
+
+class ServiceError(RuntimeError):
+    """The scoring service could not be reached or rejected a request"""
+
+
+class ScoringClient:
+    """Thin HTTP client for a running scoring service"""
+
+    def __init__(self, url=None, timeout=300):
+        self.url = (url or SERVICE_URL or "http://127.0.0.1:8765").rstrip("/")
+        self.timeout = timeout
+
+    def health(self):
+        """Service status dict, or None if it is not reachable"""
+        try:
+            with urllib.request.urlopen(f"{self.url}/health", timeout=2) as resp:
+                return json.load(resp)
+        except (OSError, ValueError):
+            return None
+
+    def score(self, df, family, name, drop_column=None):
+        """
+        Score raw rows on the service
+
+        :return: (predictions array, probabilities array or None, classes array or None)
+        """
+        import pyarrow as pa
+
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        query = {"family": family, "model": name}
+        if drop_column:
+            query["drop_column"] = drop_column
+        request = urllib.request.Request(
+            f"{self.url}/predict?{urllib.parse.urlencode(query)}", data=sink.getvalue().to_pybytes(),
+            headers={"Content-Type": "application/vnd.apache.arrow.stream"})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as resp:
+                payload = json.load(resp)
+        except urllib.error.HTTPError as e:
+            raise ServiceError(json.load(e).get("error", str(e))) from e
+        except OSError as e:
+            raise ServiceError(f"scoring service unreachable at {self.url}: {e}") from e
+        proba = payload["probabilities"]
+        classes = payload["classes"]
+        return (np.asarray(payload["predictions"]), None if proba is None else np.asarray(proba),
+                None if classes is None else np.asarray(classes))
+
+
+class RemoteModel:
+    """
+    Model stand-in for the predict pages that scores on the service
+
+    It takes raw rows (the service does the encoding), so pair it with
+    ``RemoteEncoder``. ``predict`` fetches the probabilities as well, and a
+    following ``predict_proba`` on the same frame reuses them.
+    """
+
+    def __init__(self, client, family, name):
+        self.client = client
+        self.family = family
+        self.name = name
+        self.classes_ = None
+        self._last = threading.local()
+
+    def _score(self, X):
+        last = getattr(self._last, "value", None)
+        if last is not None and last[0] is X:
+            return last[1]
+        predictions, proba, classes = self.client.score(X, self.family, self.name)
+        self.classes_ = classes
+        self._last.value = (X, (predictions, proba))
+        return predictions, proba
+
+    def predict(self, X):
+        return self._score(X)[0]
+
+    def predict_proba(self, X):
+        proba = self._score(X)[1]
+        if proba is None:
+            raise AttributeError("the service model has no predict_proba")
+        return proba
+
+
+class RemoteEncoder:
+    """Encoder stand-in that only drops the label column; the service encodes"""
+
+    def transform_frame(self, df, drop_column=None):
+        if drop_column and drop_column in df.columns:
+            return df.drop(columns=[drop_column])
+        return df
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the predict pages' models over local HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="batch worker threads per model (default: all cores)")
+    parser.add_argument("--max-batch-rows", type=int, default=8192)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0,
+                        help="how long a request waits for others to share its batch")
+    parser.add_argument("--preload", action="store_true", help="load every model at startup")
+    args = parser.parse_args(argv)
+
+    server = ScoringServer((args.host, args.port), workers=args.workers,
+                           max_batch_rows=args.max_batch_rows, max_wait_ms=args.max_wait_ms)
+    if args.preload:
+        for family in MODEL_FAMILIES:
+            for name in MODEL_NAMES:
+                if os.path.exists(model_path(family, name)):
+                    server.batcher(family, name)
+    print(f"Scoring service listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
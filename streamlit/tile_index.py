@@ -0,0 +1,176 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from geo_aggregate import TILE_PX, lonlat_to_pixels, pixels_to_lonlat
+
+
+class TileIndex:
+    """
+    Points sorted by their Web Mercator tile, for viewport queries.
+
+    Rows are ordered by (tile x, tile y) at ``index_zoom``, so the points of
+    one tile column inside a viewport are a single contiguous slice found with
+    two binary searches. Queries are answered per display tile and capped at
+    ``points_per_tile``; each capped tile is cached, so panning only does work
+    for the tiles that scroll into view.
+
+    Every point gets a fixed random priority and capped tiles keep the points
+    with the lowest priority. That makes the thinning uniform and stable, so
+    the same points stay on screen while panning and zooming in only adds
+    points.
+    """
+
+    def __init__(self, lat, lon, index_zoom=14, points_per_tile=200, max_cached_tiles=2048, seed=0):
+        """
+        :param lat: array-like of latitudes
+        :param lon: array-like of longitudes
+        :param index_zoom: int, zoom level of the tiles the points are sorted by
+        :param points_per_tile: int, density cap per 256 px display tile
+        """
+        lat = np.asarray(lat, dtype=float)
+        lon = np.asarray(lon, dtype=float)
+        rows = np.flatnonzero(np.isfinite(lat) & np.isfinite(lon))
+        lat, lon = lat[rows], lon[rows]
+
+        self.index_zoom = index_zoom
+        self.points_per_tile = points_per_tile
+        self.n_points = len(rows)
+        self._side = 2 ** index_zoom
+        x, y = lonlat_to_pixels(lon, lat, index_zoom)
+        tx = np.clip(x // TILE_PX, 0, self._side - 1).astype(np.int64)
+        ty = np.clip(y // TILE_PX, 0, self._side - 1).astype(np.int64)
+        keys = tx * self._side + ty
+        order = np.argsort(keys, kind="stable")
+
+        self.keys = keys[order]
+        self.rows = rows[order]
+        self.lat = lat[order]
+        self.lon = lon[order]
+        self.priority = np.random.default_rng(seed).random(len(order))
+        self.bounds = ((lat.min(), lon.min()), (lat.max(), lon.max())) if len(lat) else None
+        self._tx_range = (int(tx.min()), int(tx.max())) if len(tx) else (0, -1)
+
+        self._tiles = OrderedDict()
+        self._max_cached_tiles = max_cached_tiles
+        self._lock = threading.Lock()
+
+    def _in_box(self, south, west, north, east):
+        """Positions (into the sorted arrays) of the points inside a lat/lon box"""
+        (x0, x1), (y0, y1) = [
+            np.clip(np.floor(v / TILE_PX).astype(np.int64), 0, self._side - 1)
+            for v in lonlat_to_pixels(np.array([west, east]), np.array([north, south]), self.index_zoom)
+        ]
+        x0, x1 = max(int(x0), self._tx_range[0]), min(int(x1), self._tx_range[1])
+        if x0 > x1:
+            return np.empty(0, dtype=np.int64)
+        columns = np.arange(x0, x1 + 1, dtype=np.int64) * self._side
+        starts = np.searchsorted(self.keys, columns + int(y0), side="left")
+        ends = np.searchsorted(self.keys, columns + int(y1), side="right")
+        spans = [np.arange(s, e) for s, e in zip(starts, ends) if e > s]
+        if not spans:
+            return np.empty(0, dtype=np.int64)
+        pos = np.concatenate(spans)
+        # Index tiles overhang the box; trim to the exact bounds
+        inside = ((self.lat[pos] >= south) & (self.lat[pos] <= north)
+                  & (self.lon[pos] >= west) & (self.lon[pos] <= east))
+        return pos[inside]
+
+    def tile(self, z, x, y):
+        """
+        Points in one display tile, thinned to ``points_per_tile``
+
+        :return: (positions into the sorted arrays, number of points in the tile)
+        """
+        key = (z, x, y)
+        with self._lock:
+            if key in self._tiles:
+                self._tiles.move_to_end(key)
+                return self._tiles[key]
+        (west, east), (north, south) = pixels_to_lonlat(
+            np.array([x, x + 1]) * TILE_PX, np.array([y, y + 1]) * TILE_PX, z)
+        pos = self._in_box(south, west, north, east)
+        total = len(pos)
+        if total > self.points_per_tile:
+            keep = np.argpartition(self.priority[pos], self.points_per_tile)[:self.points_per_tile]
+            pos = np.sort(pos[keep])
+        with self._lock:
+            self._tiles[key] = (pos, total)
+            while len(self._tiles) > self._max_cached_tiles:
+                self._tiles.popitem(last=False)
+        return pos, total
+
+    def query(self, south, west, north, east, zoom):
+        """
+        Rows to draw for a viewport
+
+        :param zoom: int, current map zoom; sets the display tile size
+        :return: (row numbers into the original arrays, points in the covering
+                 tiles before thinning)
+        """
+        z = int(max(min(zoom, 22), 0))
+        side = 2 ** z
+        (x0, x1), (y0, y1) = [
+            np.clip(np.floor(v / TILE_PX).astype(np.int64), 0, side - 1)
+            for v in lonlat_to_pixels(np.array([west, east]), np.array([north, south]), z)
+        ]
+        parts, total = [], 0
+        for x in range(int(x0), int(x1) + 1):
+            for y in range(int(y0), int(y1) + 1):
+                pos, count = self.tile(z, x, y)
+                parts.append(pos)
+                total += count
+        # np.unique: a point exactly on a tile edge belongs to both tiles
+        pos = np.unique(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int64)
+        # Edge tiles reach past the viewport; only draw what is visible
+        inside = ((self.lat[pos] >= south) & (self.lat[pos] <= north)
+                  & (self.lon[pos] >= west) & (self.lon[pos] <= east))
+        return self.rows[pos[inside]], total
+
+    def initial_view(self, width_px=1200, height_px=700, max_zoom=18):
+        """
+        Centre, zoom and bounds that fit the whole dataset in a map of this size
+
+        :return: dict with ``center`` [lat, lon], ``zoom`` and ``bounds``
+                 (south, west, north, east)
+        """
+        if self.bounds is None:
+            return {"center": [0.0, 0.0], "zoom": 1, "bounds": (-85.0, -180.0, 85.0, 180.0)}
+        (lat0, lon0), (lat1, lon1) = self.bounds
+        zoom = 0
+        for z in range(max_zoom, -1, -1):
+            x, y = lonlat_to_pixels(np.array([lon0, lon1]), np.array([lat0, lat1]), z)
+            if abs(x[1] - x[0]) <= width_px and abs(y[1] - y[0]) <= height_px:
+                zoom = z
+                break
+        center = [float(lat0 + lat1) / 2, float(lon0 + lon1) / 2]
+        return {"center": center, "zoom": zoom, "bounds": view_bounds(center, zoom, width_px, height_px)}
+
+
+def view_bounds(center, zoom, width_px, height_px):
+    """(south, west, north, east) of a map of the given pixel size"""
+    cx, cy = lonlat_to_pixels(np.array([center[1]]), np.array([center[0]]), zoom)
+    (west, east), (north, south) = pixels_to_lonlat(
+        np.array([cx[0] - width_px / 2, cx[0] + width_px / 2]),
+        np.array([cy[0] - height_px / 2, cy[0] + height_px / 2]), zoom)
+    return float(south), float(west), float(north), float(east)
+
+
+def folium_view(state):
+    """
+    Viewport from the value ``st_folium`` returns (or stores under its key)
+
+    :return: dict with ``center``, ``zoom`` and ``bounds`` like
+             ``TileIndex.initial_view``, or None before the map has reported one
+    """
+    if not state or not state.get("bounds") or state.get("zoom") is None:
+        return None
+    sw, ne = state["bounds"].get("_southWest") or {}, state["bounds"].get("_northEast") or {}
+    corners = (sw.get("lat"), sw.get("lng"), ne.get("lat"), ne.get("lng"))
+    if None in corners:
+        return None
+    south, west, north, east = (float(c) for c in corners)
+    center = state.get("center") or {"lat": (south + north) / 2, "lng": (west + east) / 2}
+    return {"center": [center["lat"], center["lng"]], "zoom": int(state["zoom"]),
+            "bounds": (south, max(west, -180.0), north, min(east, 180.0))}
@@ -0,0 +1,82 @@
+import threading
+
+import pandas as pd
+
+from dtype_plan import is_categorical_like
+
+TIME_COLUMNS = ('Year', 'Month', 'Day')
+
+
+class TrendCube:
+    """
+    Pre-aggregated counts and sums behind the Trend Analysis charts.
+
+    Each (time column, column) cell is computed with one vectorized group-by
+    the first time it is asked for and then served from memory, so switching
+    selectboxes or chart modes only slices small tables. Two kinds of cell
+    exist: ``counts`` (rows per time x value) and ``moments`` (sum and count of
+    a numeric column per time). ``append`` folds new rows into every cell
+    already built instead of recomputing it.
+    """
+
+    def __init__(self, df, time_columns=TIME_COLUMNS):
+        self.time_columns = [c for c in time_columns if c in df.columns]
+        self._frames = [df]
+        self._cells = {}
+        self._categorical = {}
+        self._lock = threading.Lock()
+
+    @property
+    def n_rows(self):
+        return sum(len(f) for f in self._frames)
+
+    def _data(self, columns):
+        if len(self._frames) == 1:
+            return self._frames[0][columns]
+        return pd.concat([f[columns] for f in self._frames], ignore_index=True)
+
+    @staticmethod
+    def _aggregate(kind, df, time_col, col):
+        sub = df[[time_col, col]].dropna()
+        if kind == "counts":
+            return sub.groupby([time_col, col], observed=True).size()
+        return sub.groupby(time_col, observed=True)[col].agg(["sum", "count"])
+
+    def _cell(self, kind, time_col, col):
+        key = (kind, time_col, col)
+        with self._lock:
+            if key not in self._cells:
+                self._cells[key] = self._aggregate(kind, self._data([time_col, col]), time_col, col)
+            return self._cells[key]
+
+    def is_categorical(self, col):
+        """Same rule the charts always used, evaluated once per column"""
+        if col not in self._categorical:
+            self._categorical[col] = is_categorical_like(self._frames[0][col])
+        return self._categorical[col]
+
+    def separate(self, time_col, col):
+        """Row count per (time, value): the 'Separate Classes' view"""
+        return self._cell("counts", time_col, col).reset_index(name='Count')
+
+    def total(self, time_col, col):
+        """Rows with a value per time: 'Sum All Classes' for categorical columns"""
+        counts = self._cell("counts", time_col, col)
+        return counts.groupby(level=0, observed=True).sum().reset_index(name='Total Count')
+
+    def mean(self, time_col, col):
+        """Mean value per time: 'Sum All Classes' for numeric columns"""
+        moments = self._cell("moments", time_col, col)
+        return (moments["sum"] / moments["count"]).rename(col).reset_index()
+
+    def append(self, rows):
+        """
+        Fold newly arrived rows into the cube without a full recompute
+
+        :param rows: pandas.DataFrame with the same columns as the original data
+        """
+        with self._lock:
+            self._frames.append(rows)
+            for (kind, time_col, col), cell in self._cells.items():
+                delta = self._aggregate(kind, rows, time_col, col)
+                self._cells[(kind, time_col, col)] = cell.add(delta, fill_value=0).astype(cell.dtypes)
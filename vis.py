@@ -1,7 +1,15 @@
+import argparse
+import html
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 import pandas as pd
 import seaborn as sns
 import matplotlib.pyplot as plt
 
+DATASET_PATH = r'dataset/undummy_dataset.xlsx'
+
 
 def plot_graph(data, col_name):
     """
@@ -15,11 +23,9 @@ def plot_graph(data, col_name):
 
     fig, ax = plt.subplots()
 
-    # Check if the column is binary (has only two unique values)
-    if data[col_name].nunique() == 2:
-        sns.countplot(data=data, x=col_name, ax=ax)
-    else:
-        sns.histplot(data, x=col_name, ax=ax)
+    # Bars are binned with NumPy first, so the figure size does not grow with
+    # the number of rows (binary columns still get one bar per value)
+    draw_bins(ax, compute_bins(data[col_name]))
 
     ax.set_title(f"Distribution of {col_name}")
     ax.set_xlabel(col_name)
@@ -29,8 +35,121 @@ def plot_graph(data, col_name):
     plt.show()
 
 
-df = pd.read_excel(r'dataset/undummy_dataset.xlsx')
+def compute_bins(series, max_bars=30):
+    """
+    Function to precompute the bar heights of a column's distribution chart
+
+    :param series: pandas.Series, column to summarise
+    :param max_bars: int, most categories shown for text columns
+    :return: dict, {'kind': 'counts', 'labels', 'counts'} or
+             {'kind': 'histogram', 'edges', 'counts'}
+    """
+    values = series.dropna()
+    binary = series.nunique() == 2
+    if binary or not pd.api.types.is_numeric_dtype(series):
+        counts = values.value_counts().head(max_bars)
+        if binary:
+            counts = counts.sort_index()
+        return {"kind": "counts", "labels": [str(v) for v in counts.index], "counts": counts.to_numpy()}
+    counts, edges = np.histogram(values.to_numpy(dtype=float), bins="auto")
+    return {"kind": "histogram", "edges": edges, "counts": counts}
+
+
+def draw_bins(ax, bins):
+    """
+    Function to draw precomputed bins as bars
+
+    :param ax: matplotlib Axes to draw on
+    :param bins: dict, output of compute_bins
+    """
+    if bins["kind"] == "counts":
+        ax.bar(bins["labels"], bins["counts"])
+        if len(bins["labels"]) > 5:
+            ax.tick_params(axis="x", labelrotation=45)
+    else:
+        edges = bins["edges"]
+        ax.bar(edges[:-1], bins["counts"], width=np.diff(edges), align="edge")
+
+
+def _init_worker():
+    plt.switch_backend("Agg")
+    sns.set(style="whitegrid", color_codes=True)
+    sns.set_context("talk")
+
+
+def render_chart(col_name, bins, out_dir, formats, index=0):
+    """
+    Function to render one column's chart to image files (runs in a worker)
+
+    :param index: int, column position; prefixed to the file name so columns
+                  that sanitize to the same name (e.g. "a b" and "a/b") do not
+                  overwrite each other
+
+    :return: list of str, file names written
+    """
+    fig, ax = plt.subplots(figsize=(10, 6))
+    draw_bins(ax, bins)
+    ax.set_title(f"Distribution of {col_name}")
+    ax.set_xlabel(col_name)
+    ax.set_ylabel("Count")
+    fig.tight_layout()
+
+    safe = "".join(c if c.isalnum() or c in "-_" else "_" for c in str(col_name))
+    written = []
+    for fmt in formats:
+        fname = f"{index:03d}_{safe}.{fmt}"
+        fig.savefig(os.path.join(out_dir, fname))
+        written.append(fname)
+    plt.close(fig)
+    return written
+
 
-for col in df.columns:
-    plot_graph(df, col)
-    print("Graph for " + col)
\ No newline at end of file
+def write_report(data, out_dir, formats=("png",), workers=None):
+    """
+    Function to render every column's chart in parallel and write an index page
+
+    :param data: pandas.DataFrame, parsed once by the caller
+    :param out_dir: str, directory for the images and index.html
+    :param formats: tuple of str, image formats ('png', 'svg')
+    :param workers: int, process count (default: all cores)
+    :return: str, path of index.html
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    # Only the small bin arrays are shipped to the workers, not the data
+    bins = {col: compute_bins(data[col]) for col in data.columns}
+    with ProcessPoolExecutor(workers, initializer=_init_worker) as pool:
+        futures = {col: pool.submit(render_chart, col, bins[col], out_dir, tuple(formats), i)
+                   for i, col in enumerate(data.columns)}
+        files = {col: future.result() for col, future in futures.items()}
+
+    items = []
+    for col in data.columns:
+        img = html.escape(files[col][0])
+        links = " ".join(f'<a href="{html.escape(f)}">{f.rsplit(".", 1)[1]}</a>' for f in files[col])
+        items.append(f'<figure><img src="{img}" alt="{html.escape(col)}" width="600">'
+                     f'<figcaption>{html.escape(col)} ({links})</figcaption></figure>')
+    index = os.path.join(out_dir, "index.html")
+    with open(index, "w", encoding="utf-8") as f:
+        f.write("<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>EDA report</title></head>\n"
+                "<body><h1>EDA report</h1>\n" + "\n".join(items) + "\n</body></html>\n")
+    return index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Plot the distribution of every dataset column.")
+    parser.add_argument("--input", default=DATASET_PATH, help="Excel workbook to read")
+    parser.add_argument("--report", metavar="DIR",
+                        help="write a headless report (images + index.html) to DIR instead of showing plots")
+    parser.add_argument("--format", nargs="+", default=["png"], choices=["png", "svg"])
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    df = pd.read_excel(args.input)
+
+    if args.report:
+        plt.switch_backend("Agg")
+        print("Report written to " + write_report(df, args.report, args.format, args.workers))
+    else:
+        for col in df.columns:
+            plot_graph(df, col)
+            print("Graph for " + col)